@@ -0,0 +1,110 @@
+"""Synthetic data sets for the benchmarks.
+
+All generators are deterministic for a given seed, so results of different versions are comparable.
+"""
+import datetime
+import random
+import typing as t
+from pathlib import Path
+
+from ledger_manager.api.models import ExchangeRate
+
+ROOTS = ["Assets", "Expenses", "Income", "Liabilities"]
+WORDS = [
+    "Bank", "Cash", "Food", "Rent", "Travel", "Health", "Transport", "Gifts", "Taxes", "Salary", "Savings", "Hobby",
+    "Home", "Utilities", "Insurance", "Education", "Books", "Cafe", "Shop", "Market"
+]
+SYMBOLS = [
+    "EUR", "RUB", "GEL", "TRY", "GBP", "JPY", "CHF", "CNY", "AMD", "KZT", "SEK", "NOK", "PLN", "CZK", "HUF", "ILS"
+]
+
+
+def account_tree(accounts: int, depth: int, seed: int = 0) -> list[str]:
+    """`accounts` distinct leaf accounts under the ledger top level accounts, `depth` levels deep at most."""
+    rnd = random.Random(seed)
+    result: set[str] = set()
+
+    while len(result) < accounts:
+        levels = rnd.randint(2, max(depth, 2))
+        names = [rnd.choice(ROOTS)] + [f"{rnd.choice(WORDS)}{rnd.randrange(accounts)}" for _ in range(levels - 1)]
+        result.add(":".join(names))
+
+    return sorted(result)
+
+
+def write_journal(
+        path: Path,
+        postings: int,
+        accounts: int = 2000,
+        depth: int = 5,
+        start: datetime.date = datetime.date(2015, 1, 1),
+        days: int = 3650,
+        commodities: t.Sequence[str] = ("$", "EUR", "RUB"),
+        seed: int = 0,
+) -> list[str]:
+    """Write a journal of two-posting transactions, returns its accounts."""
+    rnd = random.Random(seed)
+    tree = account_tree(accounts, depth, seed)
+    dates = sorted(start + datetime.timedelta(days=rnd.randrange(days)) for _ in range(postings // 2))
+
+    with open(path, "w") as fp:
+        for i, date in enumerate(dates):
+            debit, credit = rnd.sample(tree, 2)
+            amount = rnd.randint(1, 100000) / 100
+            fp.write(f"{date:%Y/%m/%d} Payee {i % 997}\n"
+                     f"    {debit}  {amount:.2f} {rnd.choice(commodities)}\n"
+                     f"    {credit}\n\n")
+
+    return tree
+
+
+def daily_rates(
+    start: datetime.date,
+    end: datetime.date,
+    symbols: t.Sequence[str],
+    seed: int = 0,
+) -> t.Iterator[tuple[datetime.date, dict[str, float]]]:
+    """Random walk of every symbol rate for each day from `start` till `end` inclusive."""
+    rnd = random.Random(seed)
+    rates = {symbol: rnd.uniform(0.5, 100) for symbol in symbols}
+
+    for day in range((end - start).days + 1):
+        rates = {symbol: round(rate * rnd.uniform(0.98, 1.02), 6) for symbol, rate in rates.items()}
+        yield start + datetime.timedelta(days=day), rates
+
+
+def price_records(
+    start: datetime.date,
+    end: datetime.date,
+    symbols: t.Sequence[str],
+    base: str = "$",
+    seed: int = 0,
+) -> list[ExchangeRate]:
+    return [
+        ExchangeRate(
+            date=datetime.datetime.combine(date, datetime.time(), tzinfo=datetime.timezone.utc),
+            symbol=base,
+            price=price,
+            price_symbol=symbol,
+        ) for date, rates in daily_rates(start, end, symbols, seed) for symbol, price in rates.items()
+    ]
+
+
+def write_price_db(
+    path: Path,
+    start: datetime.date,
+    end: datetime.date,
+    symbols: t.Sequence[str],
+    base: str = "$",
+    seed: int = 0,
+) -> int:
+    """Write a price DB with a row per symbol per day, returns the number of rows."""
+    rows = 0
+
+    with open(path, "w") as fp:
+        for date, rates in daily_rates(start, end, symbols, seed):
+            for symbol, price in rates.items():
+                fp.write(f"P {date:%Y/%m/%d} 00:00:00 {base} {price} {symbol}\n")
+                rows += 1
+
+    return rows
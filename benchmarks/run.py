@@ -0,0 +1,322 @@
+"""Benchmark suite.
+
+    python -m benchmarks.run run --postings 1000000
+    python -m benchmarks.run compare benchmarks/results/0.1.1-abc1234.json benchmarks/results/0.1.1-def5678.json
+
+Results are saved as JSON to `benchmarks/results/` named after the package version and git commit.
+"""
+import datetime
+import json
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import threading
+import time
+import typing as t
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib import metadata
+from pathlib import Path
+from urllib.parse import parse_qs, urlparse
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from ledger_manager.api import use_cases
+from ledger_manager.api.config import AppConfig
+from ledger_manager.api.models import Consts, ExchangeRate
+from ledger_manager.api.services import LedgerClient, LedgerCmd, PriceDB
+
+from . import generators
+
+RESULTS_DIR = Path(__file__).parent / "results"
+# Common account searches: prefixes, sub-strings and regexes
+SEARCH_PATTERNS = ["^Expenses:Food", "Assets", "Travel", r"^Income:\w+:Salary"]
+
+app = typer.Typer(add_completion=False)
+console = Console()
+
+
+class Result(t.NamedTuple):
+    runs: list[float]
+    items: int
+
+    def stats(self) -> dict[str, float]:
+        return {
+            "min": min(self.runs),
+            "median": statistics.median(self.runs),
+            "mean": statistics.fmean(self.runs),
+            "runs": len(self.runs),
+            "items": self.items,
+        }
+
+
+def measure(func: t.Callable[[], t.Any], repeat: int, setup: t.Optional[t.Callable[[], t.Any]] = None, items: int = 1):
+    """Run `func` `repeat` times, `setup` is called before each run and isn't timed."""
+    runs = []
+
+    for _ in range(repeat):
+        if setup:
+            setup()
+
+        start = time.perf_counter()
+        func()
+        runs.append(time.perf_counter() - start)
+
+    return Result(runs=runs, items=items)
+
+
+class TimeSeriesHandler(BaseHTTPRequestHandler):
+    """Stand-in for the apilayer `timeseries` endpoint, serves generated rates."""
+
+    def do_GET(self) -> None:
+        query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        start, end = (datetime.datetime.strptime(query[key], Consts.DATE_FORMAT) for key in ("start_date", "end_date"))
+        rates = generators.daily_rates(start.date(), end.date(), query["symbols"].split(","))
+        timeseries = {date.strftime(Consts.DATE_FORMAT): values for date, values in rates}
+
+        body = json.dumps({
+            "success": True,
+            "timeseries": True,
+            "base": query["base"],
+            "start_date": query["start_date"],
+            "end_date": query["end_date"],
+            "rates": timeseries,
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args: t.Any) -> None:
+        pass
+
+
+@contextmanager
+def timeseries_server() -> t.Iterator[str]:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), TimeSeriesHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class StaticAccountsClient(LedgerClient):
+    """Ledger client with a fixed accounts list, so account search is timed without ledger."""
+
+    def __init__(self, transactions_path: Path, price_db_path: Path, accounts: list[str]) -> None:
+        super().__init__(transactions_path, price_db_path)
+        self.static_accounts = accounts
+
+    def accounts(self) -> list[str]:
+        return self.static_accounts
+
+
+def run_suite(
+    work_dir: Path,
+    postings: int,
+    accounts: int,
+    depth: int,
+    years: int,
+    symbols: int,
+    repeat: int,
+) -> dict[str, dict[str, float]]:
+    results: dict[str, Result] = {}
+    symbols_list = generators.SYMBOLS[:symbols]
+    end = datetime.date.today()
+    start = end.replace(year=end.year - years)
+
+    console.log(f"Generating journal with {postings} postings")
+    journal_path = work_dir / "journal.ledger"
+    tree = generators.write_journal(journal_path, postings=postings, accounts=accounts, depth=depth)
+
+    console.log(f"Generating price DB for {years} years, {symbols} symbols")
+    db_path = work_dir / "price.db"
+    db_rows = generators.write_price_db(db_path, start, end, symbols_list)
+    rows = db_path.read_text().splitlines()
+    records = [ExchangeRate.from_db_row(row) for row in rows]
+
+    console.log("PriceDB")
+    results["pricedb.read_db"] = measure(lambda: PriceDB(db_path).read_db(), repeat, items=db_rows)
+    warm_db = PriceDB(db_path)
+    warm_db.read_db()
+    results["pricedb.first_record"] = measure(warm_db.first_record, repeat, items=db_rows)
+
+    append_path = work_dir / "append.db"
+    results["pricedb.append_rows"] = measure(
+        lambda: PriceDB(append_path).append_rows(records),
+        repeat,
+        setup=lambda: append_path.write_text(""),
+        items=len(records),
+    )
+
+    console.log("ExchangeRate")
+    results["exchange_rate.from_db_row"] = measure(
+        lambda: [ExchangeRate.from_db_row(row) for row in rows],
+        repeat,
+        items=len(rows),
+    )
+    results["exchange_rate.to_db_row"] = measure(lambda: [r.to_db_row() for r in records], repeat, items=len(records))
+
+    console.log("LedgerCmd")
+    search_client = StaticAccountsClient(journal_path, db_path, tree)
+    results["ledger_cmd.search_accounts"] = measure(
+        lambda: LedgerCmd(search_client)._search_accounts(*SEARCH_PATTERNS),
+        repeat,
+        items=len(tree),
+    )
+
+    if shutil.which("ledger"):
+        client = LedgerClient(journal_path, db_path)
+        results["ledger.balance"] = measure(lambda: client.call(LedgerCmd(client).add_arguments("balance").build()),
+                                            repeat,
+                                            items=postings)
+
+    console.log("update_price_db")
+    with timeseries_server() as api_url:
+        config = AppConfig.parse_obj({
+            "transactions_path": journal_path,
+            "exchange_rates_api_settings": {
+                "api_url": api_url,
+                "api_key": "benchmark",
+                "main_currency": "USD",
+                "currencies": symbols_list,
+                "currency_aliases": {
+                    "USD": "$"
+                },
+            },
+            "price_db_settings": {
+                "path": db_path,
+                "start_date": start.isoformat(),
+            },
+        })
+        update_path = work_dir / "update.db"
+        added = len(rows) - len(rows) // 10
+
+        # The last 90% of the DB is missing, so the update reads the DB and fetches and appends the rest
+        results["use_cases.update_price_db"] = measure(
+            lambda: use_cases.update_price_db(config, price_db=PriceDB(update_path)),
+            repeat,
+            setup=lambda: update_path.write_text("\n".join(rows[:len(rows) - added]) + "\n"),
+            items=added,
+        )
+
+    return {name: result.stats() for name, result in results.items()}
+
+
+def version() -> str:
+    try:
+        package_version = metadata.version("ledger-manager")
+    except metadata.PackageNotFoundError:
+        package_version = "dev"
+
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = "unknown"
+
+    return f"{package_version}-{commit}"
+
+
+def results_table(results: dict[str, dict[str, float]], baseline: t.Optional[dict[str, dict[str, float]]] = None):
+    table = Table()
+    for column in ("Benchmark", "Min, ms", "Median, ms", "µs/item"):
+        table.add_column(column, justify="left" if column == "Benchmark" else "right", no_wrap=True)
+
+    if baseline is not None:
+        table.add_column("Baseline, ms", justify="right")
+        table.add_column("Change", justify="right")
+
+    for name, stats in results.items():
+        row = [
+            name,
+            f"{stats['min'] * 1000:.2f}",
+            f"{stats['median'] * 1000:.2f}",
+            f"{stats['median'] / stats['items'] * 1e6:.3f}",
+        ]
+
+        if baseline is not None:
+            base = baseline.get(name)
+            if base:
+                change = stats["median"] / base["median"] - 1
+                style = "red" if change > 0.1 else "green" if change < -0.1 else "default"
+                row.extend([f"{base['median'] * 1000:.2f}", f"[{style}]{change:+.1%}[/{style}]"])
+            else:
+                row.extend(["", ""])
+
+        table.add_row(*row)
+
+    return table
+
+
+@app.command()
+def run(
+        postings: int = typer.Option(100_000, help="Journal postings"),
+        accounts: int = typer.Option(2000, help="Journal leaf accounts"),
+        depth: int = typer.Option(5, help="Max account depth"),
+        years: int = typer.Option(5, help="Price DB years"),
+        symbols: int = typer.Option(8, max=len(generators.SYMBOLS), help="Price DB symbols"),
+        repeat: int = typer.Option(5, min=1),
+        output: t.Optional[Path] = typer.Option(None, "--output", "-o", help="Results file [default: results dir]"),
+        baseline: t.Optional[Path] = typer.Option(None, help="Results file to compare with"),
+):
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = run_suite(Path(work_dir), postings, accounts, depth, years, symbols, repeat)
+
+    label = version()
+    report = {
+        "version": label,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "params": {
+            "postings": postings,
+            "accounts": accounts,
+            "depth": depth,
+            "years": years,
+            "symbols": symbols,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+    if output is None:
+        RESULTS_DIR.mkdir(exist_ok=True)
+        output = RESULTS_DIR / f"{label}.json"
+
+    output.write_text(json.dumps(report, indent=2))
+    baseline_results = json.loads(baseline.read_text())["results"] if baseline else None
+
+    console.print(results_table(results, baseline_results))
+    console.print(f"Results are written to [blue]{output}[/blue]")
+
+
+@app.command()
+def compare(baseline: Path, current: Path):
+    """Compare two results files."""
+    baseline_report, current_report = (json.loads(path.read_text()) for path in (baseline, current))
+
+    if baseline_report["params"] != current_report["params"]:
+        console.print("[yellow]Warning: results are measured with different parameters[/yellow]")
+
+    console.print(f"{baseline_report['version']} -> {current_report['version']}")
+    console.print(results_table(current_report["results"], baseline_report["results"]))
+
+
+if __name__ == "__main__":
+    app()
@@ -1,10 +1,18 @@
+import os
 import sys
 
-from loguru import logger
 
-log_msg_format = ("{time:YYYY-MM-DD HH:mm:ss} | <level>{level}</level>"
-                  " | <c>{name}</c>:<c>{function}</c>:<c>{line}</c> - <level>{message}</level>")
+def setup_logging() -> None:
+    from loguru import logger
 
-logger.remove(0)  # Remove default stderr handler to prevent output doubling
-logger.add(sys.stdout, format=log_msg_format, level="DEBUG")
-logger.disable("ledger_manager")
+    log_msg_format = ("{time:YYYY-MM-DD HH:mm:ss} | <level>{level}</level>"
+                      " | <c>{name}</c>:<c>{function}</c>:<c>{line}</c> - <level>{message}</level>")
+
+    logger.remove(0)  # Remove default stderr handler to prevent output doubling
+    logger.add(sys.stdout, format=log_msg_format, level="DEBUG")
+    logger.disable("ledger_manager")
+
+
+# Shell completion doesn't log, so the fast completion path (see `__main__.py`) skips loguru import
+if not os.environ.get("_LEDGER_MANAGER_COMPLETE"):
+    setup_logging()
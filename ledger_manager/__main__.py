@@ -0,0 +1,22 @@
+import os
+
+
+def main() -> None:
+    """CLI entry point. Account pattern completion requests are answered before importing the CLI."""
+    from ledger_manager.completion import COMPLETE_VAR
+
+    if os.environ.get(COMPLETE_VAR):
+        from ledger_manager import completion, setup_logging
+
+        if completion.fast_complete():
+            return
+
+        setup_logging()
+
+    from ledger_manager.cli import app
+
+    app(prog_name="ledger-manager")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,468 @@
+import collections
+import csv
+import datetime
+import io
+import itertools
+import json
+import math
+import typing as t
+from decimal import Decimal
+
+from .constants import AggregationType, OutputFormat
+from .services.ledger import AccountAmount, AmountStyle, Posting, match_accounts, quantity_precision
+from .services.pricedb import RateMatrix
+
+# commodity -> period start -> amount
+PeriodTotals = dict[str, dict[datetime.date, Decimal]]
+# commodity -> amount
+Amounts = dict[str, Decimal]
+
+
+def period_start(date: datetime.date, aggregation: AggregationType) -> datetime.date:
+    """First day of the aggregation period containing `date` (weeks start on Monday)."""
+    if aggregation == AggregationType.daily:
+        return date
+    if aggregation == AggregationType.weekly:
+        return date - datetime.timedelta(days=date.weekday())
+    if aggregation == AggregationType.monthly:
+        return date.replace(day=1)
+    if aggregation == AggregationType.quarterly:
+        return date.replace(month=(date.month - 1) // 3 * 3 + 1, day=1)
+
+    return date.replace(month=1, day=1)
+
+
+def next_period(start: datetime.date, aggregation: AggregationType) -> datetime.date:
+    if aggregation == AggregationType.daily:
+        return start + datetime.timedelta(days=1)
+    if aggregation == AggregationType.weekly:
+        return start + datetime.timedelta(days=7)
+
+    months = {AggregationType.monthly: 1, AggregationType.quarterly: 3, AggregationType.yearly: 12}[aggregation]
+    month_index = start.month - 1 + months
+
+    return start.replace(year=start.year + month_index // 12, month=month_index % 12 + 1, day=1)
+
+
+def period_range(first: datetime.date, last: datetime.date, aggregation: AggregationType) -> list[datetime.date]:
+    """All period starts from the period of `first` till the period of `last` inclusive."""
+    periods = []
+    period = period_start(first, aggregation)
+
+    while period <= last:
+        periods.append(period)
+        period = next_period(period, aggregation)
+
+    return periods
+
+
+def aggregate(
+    postings: t.Iterable[Posting],
+    aggregations: t.Sequence[AggregationType],
+) -> dict[AggregationType, PeriodTotals]:
+    """Sum postings per period for all the aggregations in a single pass.
+
+    Daily totals are accumulated first, coarser periods are folded from them.
+    """
+    daily: dict[str, dict[datetime.date, Decimal]] = collections.defaultdict(lambda: collections.defaultdict(Decimal))
+
+    for posting in postings:
+        daily[posting.commodity][posting.date] += posting.quantity
+
+    result: dict[AggregationType, PeriodTotals] = {}
+
+    for aggregation in aggregations:
+        totals: PeriodTotals = {}
+
+        for commodity, days in daily.items():
+            periods: dict[datetime.date, Decimal] = collections.defaultdict(Decimal)
+            for date, amount in days.items():
+                periods[period_start(date, aggregation)] += amount
+
+            totals[commodity] = dict(periods)
+
+        result[aggregation] = totals
+
+    return result
+
+
+class AverageRow(t.NamedTuple):
+    period: datetime.date
+    commodity: str
+    total: Decimal
+    average: Decimal
+    rolling: t.Optional[Decimal]
+
+
+def averages(
+    totals: PeriodTotals,
+    aggregation: AggregationType,
+    begin: datetime.date,
+    end: datetime.date,
+    rolling: t.Optional[int] = None,
+) -> list[AverageRow]:
+    """Running (and optionally rolling) averages of period totals.
+
+    Periods without postings count as zero. Periods are limited by `begin` (inclusive) and `end` (exclusive).
+    """
+    rows = []
+
+    for commodity, periods in sorted(totals.items()):
+        if not periods:
+            continue
+
+        first = max(min(periods), period_start(begin, aggregation))
+        last = min(max(periods), end - datetime.timedelta(days=1))
+        window: collections.deque[Decimal] = collections.deque(maxlen=rolling or 1)
+        running_total = Decimal(0)
+
+        for i, period in enumerate(period_range(first, last, aggregation), start=1):
+            total = periods.get(period, Decimal(0))
+            running_total += total
+            window.append(total)
+
+            rows.append(
+                AverageRow(
+                    period=period,
+                    commodity=commodity,
+                    total=total,
+                    average=running_total / i,
+                    rolling=sum(window, Decimal(0)) / len(window) if rolling else None,
+                ))
+
+    return sorted(rows, key=lambda r: (r.period, r.commodity))
+
+
+def format_amount(commodity: str, amount: Decimal, style: AmountStyle = AmountStyle()) -> str:
+    """Amount with the commodity placed and the quantity rounded as `style` sets."""
+    quantity = format(amount.quantize(Decimal(1).scaleb(-style.precision)), ",f" if style.thousands else "f")
+    if not commodity:
+        return quantity
+
+    separator = " " if style.separated else ""
+    return f"{commodity}{separator}{quantity}" if style.prefix else f"{quantity}{separator}{commodity}"
+
+
+def commodity_styles(postings: t.Iterable[Posting]) -> dict[str, AmountStyle]:
+    """Default styles with the largest precision ledger printed quantities of every commodity with (cents at least).
+
+    So averages of small-unit commodities (e.g. crypto or fund units) aren't rounded to zero.
+    """
+    precisions: dict[str, int] = {}
+    for posting in postings:
+        precisions[posting.commodity] = max(precisions.get(posting.commodity, 2), quantity_precision(posting.quantity))
+
+    return {commodity: AmountStyle(precision=precision) for commodity, precision in precisions.items()}
+
+
+def amount_styles(amounts: t.Iterable[AccountAmount]) -> dict[str, AmountStyle]:
+    """Styles of commodities as ledger printed their amounts.
+
+    The largest precision of the amounts is kept, thousands are separated unless an amount of thousands wasn't.
+    """
+    styles: dict[str, AmountStyle] = {}
+    for amount in amounts:
+        style = styles.get(amount.commodity, amount.style)
+        styles[amount.commodity] = style._replace(
+            thousands=style.thousands and amount.style.thousands,
+            precision=max(style.precision, amount.style.precision),
+        )
+
+    return styles
+
+
+def render_averages(
+    aggregation: AggregationType,
+    rows: list[AverageRow],
+    rolling: t.Optional[int] = None,
+    styles: t.Optional[dict[str, AmountStyle]] = None,
+) -> str:
+    styles = styles or {}
+    header = ["Period", "Total", "Average"]
+    if rolling:
+        header.append(f"Rolling ({rolling})")
+
+    table = [header]
+    for row in rows:
+        style = styles.get(row.commodity, AmountStyle())
+        line = [
+            row.period.isoformat(),
+            format_amount(row.commodity, row.total, style),
+            format_amount(row.commodity, row.average, style),
+        ]
+        if row.rolling is not None:
+            line.append(format_amount(row.commodity, row.rolling, style))
+
+        table.append(line)
+
+    return render_table(table, title=aggregation.value.capitalize())
+
+
+def render_table(table: list[list[str]], title: t.Optional[str] = None) -> str:
+    """Plain text table: first column is left aligned, the others are right aligned."""
+    widths = [max(len(row[i]) for row in table) for i in range(len(table[0]))]
+    lines = [title] if title else []
+
+    for row in table:
+        cells = [row[0].ljust(widths[0]), *(cell.rjust(width) for cell, width in zip(row[1:], widths[1:]))]
+        lines.append("  ".join(cells).rstrip())
+
+    return "\n".join(lines) + "\n"
+
+
+class TrendMatrix(t.NamedTuple):
+    periods: list[datetime.date]
+    # (account, commodity) -> amount per period
+    rows: dict[tuple[str, str], list[Decimal]]
+
+
+def trend_matrix(
+    postings: t.Iterable[Posting],
+    aggregation: AggregationType,
+    begin: datetime.date,
+    end: datetime.date,
+    depth: t.Optional[int] = None,
+) -> TrendMatrix:
+    """Accounts x periods matrix of posting totals, accounts deeper than `depth` are rolled up to their parents.
+
+    Periods are dense from `begin` (inclusive) till `end` (exclusive), so periods without postings are zero.
+    """
+    periods = period_range(begin, end - datetime.timedelta(days=1), aggregation)
+    index = {period: i for i, period in enumerate(periods)}
+    rows: dict[tuple[str, str], list[Decimal]] = {}
+
+    for posting in postings:
+        column = index.get(period_start(posting.date, aggregation))
+        if column is None:
+            continue
+
+        account = ":".join(posting.account.split(":")[:depth])
+        row = rows.setdefault((account, posting.commodity), [Decimal(0)] * len(periods))
+        row[column] += posting.quantity
+
+    return TrendMatrix(periods=periods, rows=dict(sorted(rows.items())))
+
+
+def render_trend(
+    matrix: TrendMatrix,
+    output_format: OutputFormat = OutputFormat.table,
+    styles: t.Optional[dict[str, AmountStyle]] = None,
+) -> str:
+    periods = [p.isoformat() for p in matrix.periods]
+
+    if output_format == OutputFormat.json:
+        rows = [
+            {
+                "account": account,
+                "commodity": commodity,
+                # Exact decimal strings, floats would lose money precision
+                "values": [str(v) for v in values],
+                "total": str(sum(values, Decimal(0))),
+            } for (account, commodity), values in matrix.rows.items()
+        ]
+
+        return json.dumps({"periods": periods, "rows": rows}, ensure_ascii=False)
+
+    if output_format == OutputFormat.csv:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(["account", "commodity", *periods, "total"])
+
+        for (account, commodity), values in matrix.rows.items():
+            writer.writerow([account, commodity, *values, sum(values, Decimal(0))])
+
+        return buffer.getvalue()
+
+    table = [["Account", *periods, "Total"]]
+    for (account, commodity), values in matrix.rows.items():
+        style = (styles or {}).get(commodity, AmountStyle())
+        table.append([account, *(format_amount(commodity, v, style) for v in [*values, sum(values, Decimal(0))])])
+
+    return render_table(table)
+
+
+def account_balances(postings: t.Iterable[t.Union[Posting, AccountAmount]]) -> dict[tuple[str, str], Decimal]:
+    """Sum postings (or accounts amounts) per (account, commodity)."""
+    balances: dict[tuple[str, str], Decimal] = collections.defaultdict(Decimal)
+
+    for posting in postings:
+        balances[(posting.account, posting.commodity)] += posting.quantity
+
+    return dict(sorted(balances.items()))
+
+
+def exchange_balances(
+    balances: dict[tuple[str, str], Decimal],
+    matrix: RateMatrix,
+    target: str,
+    date: datetime.date,
+) -> dict[tuple[str, str], Decimal]:
+    """Balances converted to `target`, amounts without a rate are kept in their commodities (like `ledger -X`)."""
+    result: dict[tuple[str, str], Decimal] = collections.defaultdict(Decimal)
+
+    for (account, commodity), quantity in balances.items():
+        value = matrix.convert(quantity, commodity, target, date)
+        if value is None:
+            result[(account, commodity)] += quantity
+        else:
+            result[(account, target)] += value
+
+    return dict(sorted(result.items()))
+
+
+def render_revaluation(
+    balances: dict[tuple[str, str], Decimal],
+    matrix: RateMatrix,
+    targets: list[str],
+    date: datetime.date,
+    styles: t.Optional[dict[str, AmountStyle]] = None,
+) -> str:
+    """Accounts table with a column per target currency.
+
+    A cell is `n/a` when a commodity of the account has no rate to the column currency, other columns are kept.
+    Amounts without rates are listed under the table.
+    """
+    rows: dict[str, list[t.Optional[Decimal]]] = {}
+    totals = [Decimal(0)] * len(targets)
+    # target -> commodity -> amount without a rate
+    missing: dict[str, dict[str, Decimal]] = collections.defaultdict(lambda: collections.defaultdict(Decimal))
+
+    for (account, commodity), quantity in balances.items():
+        row = rows.setdefault(account, [Decimal(0)] * len(targets))
+
+        for i, target in enumerate(targets):
+            value = matrix.convert(quantity, commodity, target, date)
+
+            if value is None:
+                missing[target][commodity] += quantity
+                row[i] = None
+                continue
+
+            totals[i] += value
+            if row[i] is not None:
+                row[i] += value
+
+    def amount(commodity: str, value: Decimal) -> str:
+        return format_amount(commodity, value, (styles or {}).get(commodity, AmountStyle()))
+
+    def cell(commodity: str, value: t.Optional[Decimal]) -> str:
+        return "n/a" if value is None else amount(commodity, value)
+
+    table = [["Account", *targets]]
+    table.extend([account, *(cell(c, v) for c, v in zip(targets, row))] for account, row in rows.items())
+    table.append(["Total", *(amount(c, v) for c, v in zip(targets, totals))])
+
+    output = render_table(table, title=f"Rates of {date.isoformat()}")
+    missing_amounts = {
+        target: ", ".join(amount(c, v) for c, v in sorted(amounts.items()))
+        for target, amounts in missing.items()
+    }
+
+    if len(missing) == len(targets) and len(set(missing_amounts.values())) == 1:
+        output += f"No rates for: {missing_amounts[targets[0]]}\n"
+    else:
+        output += "".join(f"No {target} rates for: {amounts}\n" for target, amounts in missing_amounts.items())
+
+    return output
+
+
+class AccountTree:
+    """Accounts hierarchy with per-commodity balances and subtree rollups.
+
+    Built once from per-account balances of a single ledger query, so any depth or accounts filter is rendered
+    without another ledger run.
+    """
+
+    def __init__(
+        self,
+        balances: dict[tuple[str, str], Decimal],
+        styles: t.Optional[dict[str, AmountStyle]] = None,
+    ) -> None:
+        self.balances = balances
+        self.styles = styles or {}
+        self.children: dict[str, set[str]] = collections.defaultdict(set)
+        # Account own balance and its subtree total, the root ("") total is the grand total
+        self.own: dict[str, Amounts] = collections.defaultdict(lambda: collections.defaultdict(Decimal))
+        self.totals: dict[str, Amounts] = collections.defaultdict(lambda: collections.defaultdict(Decimal))
+
+        for (account, commodity), amount in balances.items():
+            self.own[account][commodity] += amount
+            self.totals[""][commodity] += amount
+            parent = ""
+
+            for name in itertools.accumulate(account.split(":"), lambda a, b: f"{a}:{b}"):
+                self.children[parent].add(name)
+                self.totals[name][commodity] += amount
+                parent = name
+
+    def filter(self, *patterns: str) -> "AccountTree":
+        """Tree of the accounts matching any of patterns, the same way as ledger commands match them."""
+        accounts = set(match_accounts({account for account, _ in self.balances}, *patterns))
+        return AccountTree({key: amount for key, amount in self.balances.items() if key[0] in accounts}, self.styles)
+
+    def depth_balances(self, depth: t.Optional[int] = None) -> dict[tuple[str, str], Decimal]:
+        """Balances per (account, commodity) with accounts deeper than `depth` rolled up to their parents."""
+        if depth is None:
+            return self.balances
+
+        balances: dict[tuple[str, str], Decimal] = collections.defaultdict(Decimal)
+        for (account, commodity), amount in self.balances.items():
+            balances[(":".join(account.split(":")[:depth]), commodity)] += amount
+
+        return dict(sorted(balances.items()))
+
+    def rows(self, depth: t.Optional[int] = None) -> list[tuple[int, str, Amounts]]:
+        """Accounts with non-zero totals in tree order as (indent level, label, totals), limited by `depth`.
+
+        Chains of single children without own balance are joined to one label, like ledger does.
+        """
+        result = []
+
+        def in_depth(name: str) -> bool:
+            return depth is None or name.count(":") < depth
+
+        def walk(parent: str, level: int) -> None:
+            for name in sorted(self.children.get(parent, ())):
+                label = name[len(parent) + 1:] if parent else name
+
+                while len(self.children.get(name, ())) == 1 and not any(self.own[name].values()):
+                    [child] = self.children[name]
+                    if not in_depth(child):
+                        break
+
+                    label += child[len(name):]
+                    name = child
+
+                totals = {commodity: amount for commodity, amount in sorted(self.totals[name].items()) if amount}
+                if not totals:
+                    continue
+
+                result.append((level, label, totals))
+                if name.count(":") + 1 < (depth or math.inf):
+                    walk(name, level + 1)
+
+        walk("", 0)
+        return result
+
+    def format_amount(self, commodity: str, amount: Decimal) -> str:
+        return format_amount(commodity, amount, self.styles.get(commodity, AmountStyle()))
+
+    def render(self, depth: t.Optional[int] = None) -> str:
+        """Ledger-like balance report: amounts column, indented accounts and the total of several accounts."""
+        rows = self.rows(depth)
+        total = {commodity: amount for commodity, amount in sorted(self.totals[""].items()) if amount}
+        width = max([20, *(len(self.format_amount(c, a)) for _, _, amounts in rows for c, a in amounts.items())])
+        lines = []
+
+        for level, label, amounts in rows:
+            amount_lines = [self.format_amount(c, a).rjust(width) for c, a in amounts.items()]
+            amount_lines[-1] += "  " + "  " * level + label
+            lines.extend(amount_lines)
+
+        if len(rows) > 1:
+            lines.append("-" * width)
+            lines.extend(self.format_amount(c, a).rjust(width) for c, a in total.items())
+            if not total:
+                lines.append("0".rjust(width))
+
+        return "\n".join(lines) + "\n" if lines else ""
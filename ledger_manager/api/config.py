@@ -1,17 +1,26 @@
 import datetime
+import functools
+import hashlib
 import importlib.resources
+import os
+import pickle
 import typing as t
 from pathlib import Path
 
 import arrow
 import pydantic
 import yaml
+from loguru import logger
 from typer import get_app_dir
 
-from .models import Consts
+from ledger_manager import metrics, profiling
 
-BUILTIN_CONFIG_PATH = importlib.resources.path("ledger_manager", Consts.DEFAULT_CONFIG_FILE_NAME)
+from .constants import Consts, StandardReport
+
+BUILTIN_CONFIG_PATH = Path(str(importlib.resources.files("ledger_manager") / Consts.DEFAULT_CONFIG_FILE_NAME))
 APP_CONFIG_PATH = Path(get_app_dir(Consts.APP_NAME)) / Consts.DEFAULT_CONFIG_FILE_NAME
+CACHE_DIR = Path(get_app_dir(Consts.APP_NAME)) / "cache"
+SOCKET_PATH = Path(get_app_dir(Consts.APP_NAME)) / "server.sock"
 
 
 def yaml_config_source(path: Path):
@@ -51,6 +60,8 @@ class AppConfig(pydantic.BaseSettings):
     transactions_path: Path
     exchange_rates_api_settings: ExchangeRatesSettings
     price_db_settings: PriceDBSettings
+    # Reports computed in background after the price DB update, so interactive runs get stored results
+    prewarm_reports: list[StandardReport] = []
 
     @pydantic.validator("transactions_path")
     def _transactions_path_v(cls, val: Path) -> Path:
@@ -85,3 +96,73 @@ class AppConfig(pydantic.BaseSettings):
 
         config = yaml_config_source(path)()
         return cls.parse_obj(config)
+
+
+def _snapshot_key(path: t.Optional[Path]) -> str:
+    """Key of everything config resolution depends on: config schema, config files stats, env and working dir.
+
+    Snapshots of a config model without some of the current fields aren't restored.
+    """
+    sha = hashlib.sha1(AppConfig.schema_json().encode())
+
+    for source in (path, APP_CONFIG_PATH, BUILTIN_CONFIG_PATH):
+        try:
+            stat = source.stat() if source else None
+        except OSError:
+            stat = None
+
+        sha.update(f"{source and source.absolute()}:{stat and (stat.st_mtime_ns, stat.st_size)}\n".encode())
+
+    env = sorted((k, v) for k, v in os.environ.items() if k.lower() in AppConfig.__fields__)
+    sha.update(f"{env}\n{os.getcwd()}".encode())
+
+    return sha.hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def load_config(path: t.Optional[Path] = None) -> AppConfig:
+    """Resolve config once per process.
+
+    Validated config is also persisted as a snapshot, so the next process with the same config files
+    skips YAML parsing and validation.
+    """
+    with profiling.span("config", "config") as span:
+        config, from_snapshot = _load_config(path)
+        span.set("snapshot", from_snapshot)
+        metrics.cache_lookup("config_snapshot", from_snapshot)
+
+    return config
+
+
+def _load_config(path: t.Optional[Path]) -> tuple[AppConfig, bool]:
+    key = _snapshot_key(path)
+    snapshot_name = hashlib.sha1(str(path and path.absolute()).encode()).hexdigest()
+    snapshot_path = CACHE_DIR / f"config-{snapshot_name}.pickle"
+
+    try:
+        with open(snapshot_path, "rb") as fp:
+            snapshot_key, config = pickle.load(fp)
+
+        if snapshot_key == key and isinstance(config, AppConfig):
+            logger.debug("Use config snapshot {}", snapshot_path)
+            return config, True
+
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+        pass
+
+    config = AppConfig.from_file(path)
+
+    try:
+        snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = snapshot_path.with_suffix(f".{os.getpid()}.tmp")
+
+        # Snapshot has the API key, so it's private like the server socket
+        with os.fdopen(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "wb") as fp:
+            pickle.dump((key, config), fp)
+
+        os.replace(tmp_path, snapshot_path)
+
+    except OSError as exc:
+        logger.debug("Can't save config snapshot: {}", exc)
+
+    return config, False
@@ -0,0 +1,41 @@
+import enum
+
+
+class Consts:
+    APP_NAME = "ledger-manager"
+    DEFAULT_CONFIG_FILE_NAME = "config.yaml"
+    DATE_FORMAT = "%Y-%m-%d"
+
+
+class FloorType(str, enum.Enum):
+    day = "day"
+    week = "week"
+    month = "month"
+    quarter = "quarter"
+    year = "year"
+
+    def aggregation_type(self, shift: int = 1) -> "AggregationType":
+        cur_index = list(self.__class__).index(self)
+        new_index = max(cur_index - shift, 0)
+
+        return list(AggregationType)[new_index]
+
+
+class AggregationType(str, enum.Enum):
+    daily = "daily"
+    weekly = "weekly"
+    monthly = "monthly"
+    quarterly = "quarterly"
+    yearly = "yearly"
+
+
+class OutputFormat(str, enum.Enum):
+    table = "table"
+    csv = "csv"
+    json = "json"
+
+
+class StandardReport(str, enum.Enum):
+    assets = "assets"
+    budget = "budget"
+    expenses = "expenses"
@@ -1,41 +1,19 @@
-import enum
 import json
 import re
+import typing as t
 from datetime import datetime
+from pathlib import Path
 
 import arrow
 import pydantic
+import yaml
 
+from .constants import AggregationType, Consts, FloorType, OutputFormat, StandardReport
 
-class Consts:
-    APP_NAME = "ledger-manager"
-    DEFAULT_CONFIG_FILE_NAME = "config.yaml"
-    DATE_FORMAT = "%Y-%m-%d"
-
-
-class FloorType(str, enum.Enum):
-    day = "day"
-    week = "week"
-    month = "month"
-    quarter = "quarter"
-    year = "year"
-
-    def aggregation_type(self, shift: int = 1) -> "AggregationType":
-        cur_index = list(self.__class__).index(self)
-        new_index = max(cur_index - shift, 0)
-
-        return list(AggregationType)[new_index]
-
-
-class AggregationType(str, enum.Enum):
-    daily = "daily"
-    weekly = "weekly"
-    monthly = "monthly"
-    quarterly = "quarterly"
-    yearly = "yearly"
-
-    def to_option(self) -> str:
-        return f"--{self.value}"
+__all__ = [
+    "Consts", "FloorType", "AggregationType", "OutputFormat", "StandardReport", "ExchangeRate", "ReportSpec",
+    "BatchResult", "JournalResult"
+]
 
 
 class ExchangeRate(pydantic.BaseModel):
@@ -86,3 +64,70 @@ class ExchangeRate(pydantic.BaseModel):
 
     def to_db_row(self) -> str:
         return self.Config.DB_ROW_FMT_WRITE.format_map(json.loads(self.json()))
+
+
+class ReportSpec(pydantic.BaseModel):
+    name: str
+    use_case: t.Literal["forward", "balance", "balance_tree", "average"]
+    args: list[str] = []
+    patterns: t.Optional[list[str]] = None
+    begin: t.Optional[datetime] = None
+    end: t.Optional[datetime] = None
+    floor: t.Optional[FloorType] = None
+    aggregations: t.Optional[list[AggregationType]] = None
+    rolling: t.Optional[int] = None
+    exchange: t.Optional[t.Union[str, list[str]]] = None
+    depth: t.Optional[int] = None
+    output: t.Optional[Path] = None
+
+    @pydantic.validator("begin", "end", pre=True)
+    def _date_v(cls, val: t.Any) -> t.Any:
+        # YAML loads unquoted dates as `datetime.date`
+        return arrow.get(val).datetime if val else val
+
+    @pydantic.validator("aggregations", pre=True)
+    def _aggregations_v(cls, val: t.Any) -> t.Any:
+        return [val] if isinstance(val, str) else val
+
+    @pydantic.root_validator(skip_on_failure=True)
+    def _forward_options_v(cls, values: dict[str, t.Any]) -> dict[str, t.Any]:
+        if values["use_case"] == "forward":
+            options = ("begin", "end", "floor", "aggregations", "rolling", "exchange", "depth")
+            options = [k for k in options if values.get(k)]
+            if options:
+                raise ValueError(f"Options {options} are not supported by 'forward', use 'args' instead")
+
+        if isinstance(values.get("exchange"), list) and values["use_case"] not in ("balance", "balance_tree"):
+            raise ValueError("Several exchange currencies are supported by 'balance' and 'balance_tree' only")
+
+        return values
+
+    @classmethod
+    def from_file(cls, path: Path) -> list["ReportSpec"]:
+        """Read specs list from YAML file. Specs may be a top level list or the `specs` key."""
+        with open(path) as fp:
+            data = yaml.safe_load(fp) or []
+
+        if isinstance(data, dict):
+            data = data.get("specs", [])
+
+        specs = []
+        for i, spec in enumerate(data):
+            if isinstance(spec, dict):
+                spec = {"name": f"{i}-{spec.get('use_case')}", **spec}
+
+            specs.append(cls.parse_obj(spec))
+
+        return specs
+
+
+class BatchResult(pydantic.BaseModel):
+    name: str
+    use_case: str
+    output: t.Optional[str] = None
+    error: t.Optional[str] = None
+
+
+class JournalResult(BatchResult):
+    # Config file the journal is configured by
+    journal: str
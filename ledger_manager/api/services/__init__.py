@@ -1,6 +1,12 @@
-from .apilayer import ExchangeRatesAPIException, ExchangeRatesClient
-from .ledger import LedgerClient, LedgerClientException, LedgerCmd
-from .pricedb import PriceDB
+import importlib
+import typing as t
+
+if t.TYPE_CHECKING:
+    from .apilayer import ExchangeRatesAPIException, ExchangeRatesClient
+    from .export import SQLiteExport
+    from .ledger import LedgerClient, LedgerClientException, LedgerCmd
+    from .pricedb import PriceDB
+    from .results import ResultStore
 
 __all__ = [
     "LedgerClient",
@@ -9,4 +15,25 @@ __all__ = [
     "LedgerCmd",
     "LedgerClientException",
     "ExchangeRatesAPIException",
+    "SQLiteExport",
+    "ResultStore",
 ]
+
+# Services are imported on the first access, so e.g. ledger reports don't pay for `requests` import
+_LAZY_IMPORTS = {
+    "LedgerClient": ".ledger",
+    "LedgerCmd": ".ledger",
+    "LedgerClientException": ".ledger",
+    "PriceDB": ".pricedb",
+    "ExchangeRatesClient": ".apilayer",
+    "ExchangeRatesAPIException": ".apilayer",
+    "SQLiteExport": ".export",
+    "ResultStore": ".results",
+}
+
+
+def __getattr__(name: str) -> t.Any:
+    if name not in _LAZY_IMPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    return getattr(importlib.import_module(_LAZY_IMPORTS[name], __name__), name)
@@ -1,9 +1,12 @@
+import time
 import typing as t
 from datetime import datetime
 
 import pydantic
 import requests
 
+from ledger_manager import metrics, profiling
+
 from ..config import AppConfig
 from ..models import Consts, ExchangeRate
 
@@ -55,16 +58,24 @@ class ExchangeRatesClient:
         return {"apikey": self.api_key}
 
     def get_rates(self, start_date: datetime, end_date: datetime) -> t.Iterable[ExchangeRate]:
-        response = requests.get(
-            url=self.timeseries_url(),
-            headers=self.auth_header(),
-            params={
-                "start_date": start_date.strftime(Consts.DATE_FORMAT),
-                "end_date": end_date.strftime(Consts.DATE_FORMAT),
-                "base": self.base_symbol,
-                "symbols": ",".join(self.symbols),
-            },
-        )
+        with profiling.span("http timeseries", "http", url=self.timeseries_url()) as span:
+            start = time.perf_counter()
+            response = requests.get(
+                url=self.timeseries_url(),
+                headers=self.auth_header(),
+                params={
+                    "start_date": start_date.strftime(Consts.DATE_FORMAT),
+                    "end_date": end_date.strftime(Consts.DATE_FORMAT),
+                    "base": self.base_symbol,
+                    "symbols": ",".join(self.symbols),
+                },
+            )
+            span.set("bytes", len(response.content))
+            span.set("status", response.status_code)
+
+            metrics.API_DURATION.observe(time.perf_counter() - start)
+            metrics.API_REQUESTS.inc(status=str(response.status_code))
+            metrics.API_RESPONSE_BYTES.inc(len(response.content))
 
         try:
             response.raise_for_status()
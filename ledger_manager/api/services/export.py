@@ -0,0 +1,232 @@
+import datetime
+import hashlib
+import sqlite3
+import typing as t
+from pathlib import Path
+
+from .ledger import LedgerClient, LedgerClientException, LedgerCmd, parse_quantity
+
+# One posting per line with its transaction position and header
+EXPORT_FORMAT = ("%(filename)\t%(xact.beg_line)\t%(format_date(xact.date, \"%Y-%m-%d\"))\t%(xact.code)\t%(payee)"
+                 "\t%(format_date(date, \"%Y-%m-%d\"))\t%(account)"
+                 "\t%(commodity(scrub(display_amount)))\t%(quantity(scrub(display_amount)))\n")
+
+# Bumped on incompatible schema changes, older exports are recreated
+SCHEMA_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    fingerprint TEXT NOT NULL UNIQUE,
+    date TEXT NOT NULL,
+    code TEXT NOT NULL,
+    payee TEXT NOT NULL,
+    file TEXT NOT NULL,
+    line INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS postings (
+    id INTEGER PRIMARY KEY,
+    transaction_id INTEGER NOT NULL REFERENCES transactions(id) ON DELETE CASCADE,
+    date TEXT NOT NULL,
+    account TEXT NOT NULL,
+    account_root TEXT NOT NULL,
+    account_parent TEXT,
+    account_depth INTEGER NOT NULL,
+    commodity TEXT NOT NULL,
+    amount REAL NOT NULL,
+    quantity TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS accounts (
+    name TEXT PRIMARY KEY,
+    parent TEXT,
+    depth INTEGER NOT NULL,
+    leaf TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS transactions_date ON transactions(date);
+CREATE INDEX IF NOT EXISTS postings_transaction ON postings(transaction_id);
+CREATE INDEX IF NOT EXISTS postings_account ON postings(account, date);
+CREATE INDEX IF NOT EXISTS postings_date ON postings(date);
+CREATE INDEX IF NOT EXISTS postings_commodity ON postings(commodity, date);
+CREATE INDEX IF NOT EXISTS accounts_parent ON accounts(parent);
+"""
+
+
+class ExportPosting(t.NamedTuple):
+    date: str
+    account: str
+    commodity: str
+    quantity: str
+
+
+class ExportTransaction(t.NamedTuple):
+    fingerprint: str
+    date: str
+    code: str
+    payee: str
+    file: str
+    line: int
+    postings: list[ExportPosting]
+
+
+class ExportStats(t.NamedTuple):
+    added: int
+    removed: int
+    unchanged: int
+
+
+def parse_transactions(output: str) -> list[ExportTransaction]:
+    """Group postings formatted with `EXPORT_FORMAT` into transactions.
+
+    Transaction fingerprint is a digest of its header and postings, so it doesn't change when lines above it move.
+    Equal transactions get an occurrence suffix.
+    """
+    # (file, line) -> header, postings
+    groups: dict[tuple[str, str], tuple[tuple[str, str, str], list[ExportPosting]]] = {}
+
+    for line in output.splitlines():
+        if not line:
+            continue
+
+        try:
+            file, beg_line, date, code, payee, post_date, account, commodity, quantity = line.split("\t")
+        except ValueError as exc:
+            raise LedgerClientException(f"Unexpected register line '{line}'") from exc
+
+        _, postings = groups.setdefault((file, beg_line), ((date, code, payee), []))
+        postings.append(ExportPosting(post_date, account, commodity.strip('"'), quantity.strip()))
+
+    transactions = []
+    occurrences: dict[str, int] = {}
+
+    for (file, beg_line), ((date, code, payee), postings) in groups.items():
+        sha = hashlib.sha1("\t".join((date, code, payee)).encode())
+        for posting in postings:
+            sha.update(("\n" + "\t".join(posting)).encode())
+
+        digest = sha.hexdigest()
+        occurrences[digest] = occurrences.get(digest, 0) + 1
+
+        transactions.append(
+            ExportTransaction(
+                fingerprint=f"{digest}-{occurrences[digest]}",
+                date=date,
+                code=code,
+                payee=payee,
+                file=file,
+                line=int(beg_line),
+                postings=postings,
+            ))
+
+    return transactions
+
+
+def account_hierarchy(account: str) -> tuple[str, t.Optional[str], int]:
+    """Root, parent and depth of the account."""
+    names = account.split(":")
+    return names[0], ":".join(names[:-1]) or None, len(names)
+
+
+class SQLiteExport:
+    """Journal postings in a SQLite DB, updated incrementally.
+
+    Only the writes are incremental: every export with changed journal files reads the whole register, since
+    an edit may touch a transaction of any date. Only transactions added or changed since the last export
+    are written, the export is skipped at all while the journal files are unchanged.
+
+    Postings have the numeric `amount` and the `quantity` as formatted by ledger.
+    """
+
+    def __init__(self, db_path: Path, client: LedgerClient) -> None:
+        self.db_path = db_path
+        self.client = client
+
+    def _connect(self) -> sqlite3.Connection:
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        connection = sqlite3.connect(self.db_path)
+        connection.execute("PRAGMA foreign_keys = ON")
+
+        if connection.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+            with connection:
+                for table in ("postings", "transactions", "accounts", "meta"):
+                    connection.execute(f"DROP TABLE IF EXISTS {table}")
+                connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+        connection.executescript(SCHEMA)
+
+        return connection
+
+    def export(self, force: bool = False) -> ExportStats:
+        journal_fingerprint = self.client.inputs.fingerprint(self.client.inputs.paths()[:-1])
+        connection = self._connect()
+
+        try:
+            with connection:
+                row = connection.execute("SELECT value FROM meta WHERE key = 'journal_fingerprint'").fetchone()
+                if not force and row and row[0] == journal_fingerprint:
+                    count = connection.execute("SELECT count(*) FROM transactions").fetchone()[0]
+                    return ExportStats(added=0, removed=0, unchanged=count)
+
+                output = LedgerCmd(self.client).add_arguments("register").add_options(format=EXPORT_FORMAT).call()
+                stats = self._apply(connection, parse_transactions(output))
+
+                connection.executemany("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", [
+                    ("journal", str(self.client.transactions_path)),
+                    ("journal_fingerprint", journal_fingerprint),
+                    ("exported_at", datetime.datetime.now().isoformat(timespec="seconds")),
+                ])
+
+            return stats
+
+        finally:
+            connection.close()
+
+    def _apply(self, connection: sqlite3.Connection, transactions: list[ExportTransaction]) -> ExportStats:
+        rows = connection.execute("SELECT id, fingerprint, file, line FROM transactions")
+        stored = {fingerprint: (id_, file, line) for id_, fingerprint, file, line in rows}
+        current = {transaction.fingerprint: transaction for transaction in transactions}
+
+        removed = [(stored[fingerprint][0], ) for fingerprint in stored.keys() - current.keys()]
+        connection.executemany("DELETE FROM transactions WHERE id = ?", removed)
+
+        # Kept transactions may move when lines above them are added or removed
+        moved = [(transaction.file, transaction.line, stored[fingerprint][0])
+                 for fingerprint, transaction in current.items()
+                 if fingerprint in stored and stored[fingerprint][1:] != (transaction.file, transaction.line)]
+        connection.executemany("UPDATE transactions SET file = ?, line = ? WHERE id = ?", moved)
+
+        added = [transaction for fingerprint, transaction in current.items() if fingerprint not in stored]
+        for transaction in added:
+            cursor = connection.execute(
+                "INSERT INTO transactions (fingerprint, date, code, payee, file, line) VALUES (?, ?, ?, ?, ?, ?)",
+                transaction[:-1],
+            )
+            connection.executemany(
+                "INSERT INTO postings (transaction_id, date, account, account_root, account_parent, account_depth,"
+                " commodity, amount, quantity) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [(cursor.lastrowid, p.date, p.account, *account_hierarchy(p.account), p.commodity,
+                  float(parse_quantity(p.quantity)), p.quantity) for p in transaction.postings],
+            )
+
+        if added or removed:
+            self._update_accounts(connection)
+
+        return ExportStats(added=len(added), removed=len(removed), unchanged=len(current) - len(added))
+
+    def _update_accounts(self, connection: sqlite3.Connection) -> None:
+        """Rebuild accounts table: all the posted accounts with their parents."""
+        accounts = set()
+
+        for (account, ) in connection.execute("SELECT DISTINCT account FROM postings"):
+            names = account.split(":")
+            accounts.update(":".join(names[:i]) for i in range(1, len(names) + 1))
+
+        connection.execute("DELETE FROM accounts")
+        connection.executemany(
+            "INSERT INTO accounts (name, parent, depth, leaf) VALUES (?, ?, ?, ?)",
+            [(account, account_hierarchy(account)[1], account.count(":") + 1, account.rsplit(":", 1)[-1])
+             for account in sorted(accounts)],
+        )
@@ -0,0 +1,100 @@
+import glob
+import hashlib
+import os
+import re
+import typing as t
+from pathlib import Path
+
+INCLUDE_RE = re.compile(r"^!?include\s+(?P<path>.+?)\s*$")
+
+StatKey = tuple[int, int, int] | None
+
+
+def stat_key(path: Path) -> StatKey:
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+
+    return stat.st_ino, stat.st_size, stat.st_mtime_ns
+
+
+def _resolve_include(base_dir: Path, pattern: str) -> list[Path]:
+    pattern = os.path.expanduser(pattern.strip("\"'"))
+    full_pattern = os.path.normpath(pattern if os.path.isabs(pattern) else base_dir / pattern)
+
+    if glob.has_magic(full_pattern):
+        return [Path(p) for p in sorted(glob.glob(full_pattern))]
+
+    return [Path(full_pattern)]
+
+
+def journal_files(path: Path) -> list[Path]:
+    """Journal file with all its `include`-d files (recursively, depth-first)."""
+    result: list[Path] = []
+    queue = [path.absolute()]
+
+    while queue:
+        current = queue.pop(0)
+        if current in result:
+            continue
+
+        result.append(current)
+
+        try:
+            with open(current, encoding="utf-8", errors="replace") as fp:
+                includes = [m.group("path") for m in map(INCLUDE_RE.match, fp) if m]
+        except OSError:
+            continue
+
+        queue[:0] = [p for include in includes for p in _resolve_include(current.parent, include)]
+
+    return result
+
+
+class InputFiles:
+    """Files a ledger report depends on: the journal, its includes and the price DB.
+
+    Content digests are cached by file stat, so repeated fingerprints cost a few `stat` calls.
+    """
+
+    def __init__(self, transactions_path: Path, price_db_path: Path) -> None:
+        self.transactions_path = transactions_path
+        self.price_db_path = price_db_path
+        self._journal_files: list[Path] = []
+        self._journal_stats: list[StatKey] = []
+        self._digests: dict[Path, tuple[StatKey, str]] = {}
+
+    def paths(self) -> list[Path]:
+        stats = [stat_key(p) for p in self._journal_files]
+
+        if not self._journal_files or stats != self._journal_stats:
+            self._journal_files = journal_files(self.transactions_path)
+            self._journal_stats = [stat_key(p) for p in self._journal_files]
+
+        return [*self._journal_files, self.price_db_path.absolute()]
+
+    def digest(self, path: Path) -> str:
+        file_stat = stat_key(path)
+        if file_stat is None:
+            return ""
+
+        cached = self._digests.get(path)
+        if cached and cached[0] == file_stat:
+            return cached[1]
+
+        sha = hashlib.sha1()
+        with open(path, "rb") as fp:
+            for chunk in iter(lambda: fp.read(1 << 20), b""):
+                sha.update(chunk)
+
+        self._digests[path] = (file_stat, sha.hexdigest())
+        return sha.hexdigest()
+
+    def fingerprint(self, paths: t.Optional[t.Iterable[Path]] = None) -> str:
+        sha = hashlib.sha1()
+
+        for path in paths if paths is not None else self.paths():
+            sha.update(f"{path}\0{self.digest(path)}\n".encode())
+
+        return sha.hexdigest()
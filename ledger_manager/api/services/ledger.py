@@ -1,12 +1,24 @@
+import datetime
 import itertools
+import locale
+import os
 import re
 import subprocess
+import threading
+import time
 import typing as t
+from decimal import Decimal, InvalidOperation
 from pathlib import Path
 
 from loguru import logger
 
+from ledger_manager import metrics, profiling
+
 from ..config import AppConfig
+from .journal import InputFiles
+
+if t.TYPE_CHECKING:
+    from .results import ResultStore
 
 T = t.TypeVar("T", bound="LedgerClient")
 
@@ -15,6 +27,137 @@ class LedgerClientException(Exception):
     pass
 
 
+class Posting(t.NamedTuple):
+    date: datetime.date
+    account: str
+    commodity: str
+    quantity: Decimal
+
+
+# Machine-readable register: one tab separated posting per line
+REGISTER_FORMAT = ("%(format_date(date, \"%Y-%m-%d\"))\t%(account)"
+                   "\t%(commodity(scrub(display_amount)))\t%(quantity(scrub(display_amount)))\n")
+
+
+class AmountStyle(t.NamedTuple):
+    """How amounts of a commodity are printed."""
+    # Commodity goes before the quantity, separated by a space
+    prefix: bool = True
+    separated: bool = True
+    thousands: bool = True
+    precision: int = 2
+
+
+class AccountAmount(t.NamedTuple):
+    account: str
+    commodity: str
+    quantity: Decimal
+    # How ledger printed the amount
+    style: AmountStyle = AmountStyle()
+
+
+# Machine-readable flat balance: account own amount and the account name. Like in ledger balance report,
+# an amount of several commodities takes a line per commodity and the account follows the last one.
+BALANCE_FORMAT = "%(scrub(display_amount))\t%(account)\n"
+
+AMOUNT_RE = re.compile(r'(?P<prefix>"[^"]*"|[^\d\s.,"-]+)?\s*(?P<quantity>-?[\d,]*\.?\d+)\s*(?P<suffix>"[^"]*"|\S+)?')
+
+
+def parse_quantity(value: str) -> Decimal:
+    try:
+        return Decimal(value.strip().replace(",", ""))
+    except InvalidOperation as exc:
+        raise LedgerClientException(f"Unexpected amount '{value}' in ledger output") from exc
+
+
+def quantity_precision(quantity: Decimal) -> int:
+    """Decimal places of the quantity as ledger printed it."""
+    exponent = quantity.as_tuple().exponent
+    return max(0, -exponent) if isinstance(exponent, int) else 0
+
+
+def parse_register(output: str) -> t.Iterator[Posting]:
+    """Parse register output formatted with `REGISTER_FORMAT`."""
+    for line in output.splitlines():
+        if not line:
+            continue
+
+        try:
+            date, account, commodity, quantity = line.split("\t")
+        except ValueError as exc:
+            raise LedgerClientException(f"Unexpected register line '{line}'") from exc
+
+        yield Posting(
+            date=datetime.date.fromisoformat(date),
+            account=account,
+            commodity=commodity.strip('"'),
+            quantity=parse_quantity(quantity),
+        )
+
+
+def parse_amount(value: str) -> tuple[str, Decimal, AmountStyle]:
+    """Commodity, quantity and style of an amount printed by ledger, e.g. `$-1,500.00` or `7 AAPL`."""
+    match = AMOUNT_RE.fullmatch(value.strip())
+    if match is None or (match["prefix"] and match["suffix"]):
+        raise LedgerClientException(f"Unexpected amount '{value}' in ledger output")
+
+    commodity = match["prefix"] or match["suffix"] or ""
+    quantity = parse_quantity(match["quantity"])
+    prefix = bool(match["prefix"])
+    if prefix:
+        separated = match.end("prefix") < match.start("quantity")
+    else:
+        separated = match.end("quantity") < match.start("suffix")
+
+    style = AmountStyle(
+        prefix=prefix,
+        separated=separated,
+        # Only amounts of thousands show whether ledger separates them
+        thousands="," in match["quantity"] or abs(quantity) < 1000,
+        precision=quantity_precision(quantity),
+    )
+
+    return commodity.strip('"'), quantity, style
+
+
+def parse_balance(output: str) -> t.Iterator[AccountAmount]:
+    """Parse balance output formatted with `BALANCE_FORMAT`, zero amounts are skipped."""
+    amounts: list[str] = []
+
+    for line in output.splitlines():
+        if not line.strip():
+            continue
+
+        amount, tab, account = line.partition("\t")
+        amounts.append(amount)
+        if not tab:
+            continue
+
+        for commodity, quantity, style in map(parse_amount, amounts):
+            if quantity:
+                yield AccountAmount(account=account, commodity=commodity, quantity=quantity, style=style)
+
+        amounts = []
+
+    if amounts:
+        raise LedgerClientException(f"Unexpected balance line '{amounts[-1]}'")
+
+
+def match_accounts(accounts: t.Iterable[str], *patterns: str) -> list[str]:
+    """Accounts matching any of Python-style regexes (from the account start) or containing any of the patterns."""
+    accounts = list(accounts)
+    result = set()
+
+    for pattern in patterns:
+        regex = re.compile(pattern)
+        for account in accounts:
+            if regex.match(account) or pattern in account:
+                result.add(account)
+
+    # Sorted, so equal searches build equal commands in every process (see `ResultStore`)
+    return sorted(result)
+
+
 class LedgerCmd:
 
     def __init__(self, client: 'LedgerClient') -> None:
@@ -41,23 +184,10 @@ class LedgerCmd:
         return list(itertools.chain.from_iterable(self._options.items()))
 
     def _list_accounts(self) -> list[str]:
-        cmd = [*self._cmd_base, "accounts"]
-        accounts = [s.strip() for s in self._client.call(cmd).split("\n")]
-        accounts = [s for s in accounts if s]
-
-        return accounts
+        return self._client.accounts()
 
     def _search_accounts(self, *patterns: str) -> list[str]:
-        accounts = self._list_accounts()
-        result = set()
-
-        for pattern in patterns:
-            regex = re.compile(pattern)
-            for account in accounts:
-                if regex.match(account) or pattern in account:
-                    result.add(account)
-
-        return list(result)
+        return match_accounts(self._list_accounts(), *patterns)
 
     def add_options(self, **options: t.Any) -> 'LedgerCmd':
         for option_name, option_value in options.items():
@@ -74,6 +204,9 @@ class LedgerCmd:
         return self
 
     def add_accounts(self, *patterns: str) -> 'LedgerCmd':
+        if not patterns:
+            return self
+
         accounts = self._search_accounts(*patterns)
         self._accounts.extend(accounts)
 
@@ -85,24 +218,139 @@ class LedgerCmd:
     def call(self) -> str:
         return self._client.call(self.build())
 
+    def postings(self) -> t.Iterator[Posting]:
+        """Call the `register` command (its arguments are set by the caller) and parse postings."""
+        return parse_register(self.add_options(format=REGISTER_FORMAT).call())
+
+    def balances(self) -> t.Iterator[AccountAmount]:
+        """Call the `balance` command (its arguments are set by the caller) and parse accounts own amounts."""
+        return parse_balance(self.add_options(format=BALANCE_FORMAT).call())
+
 
 class LedgerClient:
 
-    def __init__(self, transactions_path: Path, price_db_path: Path) -> None:
+    def __init__(
+        self,
+        transactions_path: Path,
+        price_db_path: Path,
+        cache_results: bool = False,
+        result_store: t.Optional["ResultStore"] = None,
+    ) -> None:
         self.transactions_path = transactions_path
         self.price_db_path = price_db_path
+        self.inputs = InputFiles(transactions_path, price_db_path)
+        self.cache_results = cache_results
+        self.result_store = result_store
+        self._accounts: t.Optional[tuple[str, list[str]]] = None
+        self._results: dict[tuple[str, ...], tuple[str, str]] = {}
+        self._locks: dict[tuple[str, ...], threading.Lock] = {}
+        self._locks_lock = threading.Lock()
 
     @classmethod
-    def from_config(cls: t.Type[T], config: AppConfig) -> T:
+    def from_config(
+        cls: t.Type[T],
+        config: AppConfig,
+        cache_results: bool = False,
+        result_store: t.Optional["ResultStore"] = None,
+    ) -> T:
         return cls(
             transactions_path=config.transactions_path,
             price_db_path=config.price_db_settings.path,
+            cache_results=cache_results,
+            result_store=result_store,
         )
 
+    def _lock(self, key: tuple[str, ...]) -> threading.Lock:
+        """Per-key lock, so concurrent callers of the same command wait for a single ledger run."""
+        with self._locks_lock:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def accounts(self) -> list[str]:
+        """Journal accounts list. Cached until the journal inputs change."""
+        cmd = ["ledger", "-f", str(self.transactions_path), "accounts"]
+
+        with self._lock(tuple(cmd)):
+            fingerprint = self.inputs.fingerprint()
+
+            metrics.cache_lookup("accounts", bool(self._accounts and self._accounts[0] == fingerprint))
+
+            if self._accounts and self._accounts[0] == fingerprint:
+                return self._accounts[1]
+
+            accounts = [s.strip() for s in self._call(cmd).split("\n")]
+            accounts = [s for s in accounts if s]
+
+            self._accounts = (fingerprint, accounts)
+            return accounts
+
     def call(self, cmd: list[str]) -> str:
+        """Run ledger command. Its result is reused while the inputs are unchanged if results are cached or stored."""
+        if not self.cache_results and self.result_store is None:
+            return self._call(cmd)
+
+        key = tuple(cmd)
+
+        with self._lock(key):
+            fingerprint = self.inputs.fingerprint()
+
+            if self.cache_results:
+                cached = self._results.get(key)
+                metrics.cache_lookup("ledger_results", bool(cached and cached[0] == fingerprint))
+
+                if cached and cached[0] == fingerprint:
+                    logger.debug("Reuse cmd result: {}", cmd)
+                    return cached[1]
+
+            output = self._stored_call(cmd, fingerprint)
+
+            if self.cache_results:
+                self._cache_result(key, fingerprint, output)
+
+            return output
+
+    def _cache_result(self, key: tuple[str, ...], fingerprint: str, output: str) -> None:
+        """Cache the result and drop results of stale inputs, so a long-running server doesn't grow on every change."""
+        with self._locks_lock:
+            self._results = {k: v for k, v in self._results.items() if v[0] == fingerprint}
+            self._results[key] = (fingerprint, output)
+            self._locks = {k: lock for k, lock in self._locks.items() if k in self._results or lock.locked()}
+
+    def _stored_call(self, cmd: list[str], fingerprint: str) -> str:
+        if self.result_store is None:
+            return self._call(cmd)
+
+        output = self.result_store.get(cmd, fingerprint)
+        metrics.cache_lookup("result_store", output is not None)
+
+        if output is not None:
+            logger.debug("Use stored cmd result: {}", cmd)
+            return output
+
+        output = self._call(cmd)
+        self.result_store.put(cmd, fingerprint, output)
+
+        return output
+
+    def _call(self, cmd: list[str]) -> str:
         logger.debug("Exec cmd: {}", cmd)
-        proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-        stdout, stderr = proc.communicate()
+        command = next((arg for arg in cmd[3:] if not arg.startswith("-")), "")
+
+        with profiling.span(f"ledger {command}".strip(), "subprocess", cmd=" ".join(cmd)) as span:
+            cpu_start, start = os.times(), time.perf_counter()
+            proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+            stdout_bytes, stderr_bytes = proc.communicate()
+            cpu_end = os.times()
+
+            metrics.LEDGER_DURATION.observe(time.perf_counter() - start, command=command)
+            metrics.LEDGER_CALLS.inc(command=command, status="error" if stderr_bytes else "ok")
+
+            # Children CPU time is process-wide, so it's approximate for concurrent calls
+            span.set("cpu", (cpu_end.children_user - cpu_start.children_user) +
+                     (cpu_end.children_system - cpu_start.children_system))
+            span.set("bytes", len(stdout_bytes) + len(stderr_bytes))
+
+        encoding = locale.getpreferredencoding(False)
+        stdout, stderr = stdout_bytes.decode(encoding), stderr_bytes.decode(encoding)
 
         if stderr:
             raise LedgerClientException(stderr)
@@ -1,27 +1,121 @@
+import collections
+import datetime
+import hashlib
+import math
+import os
+import pickle
 import typing as t
+from array import array
+from decimal import Decimal
 from pathlib import Path
 
+from loguru import logger
+
+from ledger_manager import metrics
+
+from .. import config as app_config
 from ..config import AppConfig
 from ..models import ExchangeRate
+from .journal import StatKey, stat_key
 
 T = t.TypeVar("T", bound="PriceDB")
 
 
+class RateMatrix:
+    """Dense day x currency matrix of exchange rates.
+
+    Values are units of a currency per one unit of the base currency, forward-filled for the days without prices.
+    Days after the last price use the last known rate.
+    """
+
+    def __init__(self, base: str, start: datetime.date, rates: dict[str, array]) -> None:
+        self.base = base
+        self.start = start
+        self.rates = rates
+
+    @property
+    def days(self) -> int:
+        return max(map(len, self.rates.values()), default=0)
+
+    @classmethod
+    def from_records(cls, records: t.Sequence[ExchangeRate]) -> "RateMatrix":
+        if not records:
+            return cls(base="", start=datetime.date.min, rates={})
+
+        # Base is the currency most of the prices are given for
+        base = collections.Counter(r.symbol for r in records).most_common(1)[0][0]
+        start = min(r.date for r in records).date()
+        days = (max(r.date for r in records).date() - start).days + 1
+        rates: dict[str, array] = {}
+
+        for record in sorted(records, key=lambda r: r.date):
+            if record.symbol == base:
+                symbol, rate = record.price_symbol, record.price
+            elif record.price_symbol == base and record.price:
+                symbol, rate = record.symbol, 1 / record.price
+            else:
+                continue
+
+            column = rates.setdefault(symbol, array("d", [math.nan]) * days)
+            column[(record.date.date() - start).days] = rate
+
+        for column in rates.values():
+            for i in range(1, days):
+                if math.isnan(column[i]):
+                    column[i] = column[i - 1]
+
+        return cls(base=base, start=start, rates=rates)
+
+    def rate(self, symbol: str, date: datetime.date) -> t.Optional[float]:
+        if symbol == self.base:
+            return 1.0
+
+        column = self.rates.get(symbol)
+        index = min((date - self.start).days, self.days - 1)
+
+        if column is None or index < 0 or math.isnan(column[index]):
+            return None
+
+        return column[index]
+
+    def convert(self, amount: Decimal, from_symbol: str, to_symbol: str, date: datetime.date) -> t.Optional[Decimal]:
+        """Amount in `to_symbol`. Computed in `Decimal`, so exact amounts are only multiplied by the rates."""
+        if from_symbol == to_symbol:
+            return amount
+
+        from_rate, to_rate = self.rate(from_symbol, date), self.rate(to_symbol, date)
+        if not from_rate or to_rate is None:
+            return None
+
+        return amount * Decimal(repr(to_rate)) / Decimal(repr(from_rate))
+
+
 class PriceDB:
 
     def __init__(self, db_path: Path) -> None:
         self.db_path = db_path
+        self._records: t.Optional[tuple[StatKey, list[ExchangeRate]]] = None
 
     @classmethod
     def from_config(cls: t.Type[T], config: AppConfig) -> T:
         return cls(db_path=config.price_db_settings.path)
 
     def read_db(self) -> list[ExchangeRate]:
-        if not self.db_path.exists():
+        """Parsed DB records. Cached until the DB file changes."""
+        file_stat = stat_key(self.db_path)
+        if file_stat is None:
             return []
 
+        metrics.cache_lookup("price_db", bool(self._records and self._records[0] == file_stat))
+
+        if self._records and self._records[0] == file_stat:
+            return self._records[1]
+
         with open(self.db_path, "r") as fp:
-            return [ExchangeRate.from_db_row(row) for row in fp.readlines()]
+            records = [ExchangeRate.from_db_row(row) for row in fp.readlines()]
+
+        self._records = (file_stat, records)
+        return records
 
     def first_record(self) -> ExchangeRate | None:
         records = self.read_db()
@@ -31,8 +125,45 @@ class PriceDB:
         records = self.read_db()
         return max(records, key=lambda r: r.date, default=None)  # type: ignore
 
-    def append_rows(self, rows: t.Iterable[ExchangeRate]) -> None:
+    def append_rows(self, rows: t.Iterable[ExchangeRate]) -> int:
         rows = sorted(list(rows), key=lambda r: r.date)
 
         with open(self.db_path, "a") as fp:
             fp.writelines([f"{r.to_db_row()}\n" for r in rows])
+
+        metrics.PRICE_DB_ROWS.inc(len(rows))
+        return len(rows)
+
+    def rate_matrix(self) -> RateMatrix:
+        """Rates matrix of the DB. Cached on disk until the DB file changes."""
+        file_stat = stat_key(self.db_path)
+        cache_name = hashlib.sha1(str(self.db_path.absolute()).encode()).hexdigest()
+        cache_path = app_config.CACHE_DIR / f"rates-{cache_name}.pickle"
+
+        try:
+            with open(cache_path, "rb") as fp:
+                cached_stat, matrix = pickle.load(fp)
+
+            if cached_stat == file_stat and isinstance(matrix, RateMatrix):
+                metrics.cache_lookup("rate_matrix", True)
+                return matrix
+
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ValueError):
+            pass
+
+        metrics.cache_lookup("rate_matrix", False)
+        matrix = RateMatrix.from_records(self.read_db())
+
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = cache_path.with_suffix(f".{os.getpid()}.tmp")
+
+            with open(tmp_path, "wb") as fp:
+                pickle.dump((file_stat, matrix), fp)
+
+            os.replace(tmp_path, cache_path)
+
+        except OSError as exc:
+            logger.debug("Can't save rates matrix: {}", exc)
+
+        return matrix
@@ -0,0 +1,61 @@
+import hashlib
+import os
+import shutil
+import typing as t
+from pathlib import Path
+
+from ..config import CACHE_DIR, AppConfig
+
+T = t.TypeVar("T", bound="ResultStore")
+
+
+class ResultStore:
+    """Ledger outputs persisted between processes, keyed by command and the inputs fingerprint.
+
+    Outputs are stored in a directory per fingerprint, so results of the changed journal or price DB are never served
+    and are removed all at once by `prune`. The first output of a new fingerprint prunes the others, so the store
+    keeps outputs of the current inputs only.
+    """
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    @classmethod
+    def from_config(cls: t.Type[T], config: AppConfig) -> T:
+        name = hashlib.sha1(str(config.transactions_path).encode()).hexdigest()
+        return cls(CACHE_DIR / "results" / name)
+
+    def _entry_path(self, cmd: list[str], fingerprint: str) -> Path:
+        key = hashlib.sha1("\0".join(cmd).encode()).hexdigest()
+        return self.path / fingerprint / f"{key}.txt"
+
+    def get(self, cmd: list[str], fingerprint: str) -> t.Optional[str]:
+        try:
+            return self._entry_path(cmd, fingerprint).read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def put(self, cmd: list[str], fingerprint: str, output: str) -> None:
+        path = self._entry_path(cmd, fingerprint)
+
+        if not path.parent.exists():
+            self.prune(fingerprint)
+            path.parent.mkdir(parents=True, exist_ok=True)
+
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+        try:
+            tmp_path.write_text(output, encoding="utf-8")
+            os.replace(tmp_path, path)
+        except OSError:
+            # Pruned meanwhile by a process with other inputs, the output just isn't stored
+            tmp_path.unlink(missing_ok=True)
+
+    def prune(self, fingerprint: str) -> None:
+        """Remove outputs of all the other fingerprints."""
+        if not self.path.exists():
+            return
+
+        for path in self.path.iterdir():
+            if path.name != fingerprint:
+                shutil.rmtree(path, ignore_errors=True)
@@ -0,0 +1,148 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+import typing as t
+from pathlib import Path
+
+from loguru import logger
+
+from .journal import InputFiles
+
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_CLOEXEC = 0o2000000
+IN_WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class Inotify:
+    """Minimal ctypes binding for Linux inotify.
+
+    Directories are watched instead of files, because editors usually save by renaming a temp file.
+    """
+
+    def __init__(self) -> None:
+        libc_name = ctypes.util.find_library("c")
+        if not libc_name:
+            raise OSError("libc not found")
+
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_CLOEXEC)
+        self._watched: set[Path] = set()
+
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+    def watch_dirs(self, dirs: t.Iterable[Path]) -> None:
+        for directory in set(dirs) - self._watched:
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), IN_WATCH_MASK)
+            if wd < 0:
+                logger.debug("Can't watch {}: errno {}", directory, ctypes.get_errno())
+                continue
+
+            self._watched.add(directory)
+
+    def read_events(self, timeout: t.Optional[float]) -> int:
+        """Wait for events at most `timeout` seconds and drain them. Returns events count."""
+        ready, _, _ = select.select([self._fd], [], [], timeout)
+        if not ready:
+            return 0
+
+        buffer = os.read(self._fd, 64 * 1024)
+        count, offset = 0, 0
+
+        while offset < len(buffer):
+            _, _, _, name_len = EVENT_HEADER.unpack_from(buffer, offset)
+            offset += EVENT_HEADER.size + name_len
+            count += 1
+
+        return count
+
+    def close(self) -> None:
+        os.close(self._fd)
+
+
+class InputWatcher:
+    """Blocks until report inputs change.
+
+    Uses inotify when available and falls back to polling. Bursts of events are debounced,
+    and the wait returns only when the inputs fingerprint actually changed.
+    """
+
+    def __init__(
+        self,
+        inputs: InputFiles,
+        debounce: float = 0.3,
+        poll_interval: float = 1.0,
+        use_inotify: bool = True,
+    ) -> None:
+        self.inputs = inputs
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._fingerprint = inputs.fingerprint()
+        self._inotify: t.Optional[Inotify] = None
+
+        if use_inotify:
+            try:
+                self._inotify = Inotify()
+            except (OSError, AttributeError) as exc:
+                logger.debug("inotify is unavailable, fallback to polling: {}", exc)
+
+        # Watches are added before the first run, so changes saved during it aren't missed
+        self._watch_inputs()
+
+    def _watch_inputs(self) -> None:
+        if self._inotify:
+            self._inotify.watch_dirs(p.parent for p in self.inputs.paths())
+
+    def _wait_event(self) -> None:
+        if self._inotify:
+            self._watch_inputs()
+            while not self._inotify.read_events(timeout=None):
+                pass
+
+            # Debounce: drain events until the burst is over
+            while self._inotify.read_events(timeout=self.debounce):
+                pass
+
+        else:
+            fingerprint = self._fingerprint
+            while fingerprint == self._fingerprint:
+                time.sleep(self.poll_interval)
+                fingerprint = self.inputs.fingerprint()
+
+            # Debounce: wait until inputs are stable
+            while True:
+                time.sleep(self.debounce)
+                fingerprint, previous = self.inputs.fingerprint(), fingerprint
+                if fingerprint == previous:
+                    break
+
+    def wait(self) -> str:
+        """Wait for the next change of the inputs and return the new fingerprint.
+
+        Returns at once if the inputs have changed since the previous wait (e.g. during a run).
+        """
+        fingerprint = self.inputs.fingerprint()
+
+        while fingerprint == self._fingerprint:
+            self._wait_event()
+            fingerprint = self.inputs.fingerprint()
+
+            if fingerprint == self._fingerprint:
+                logger.debug("Inputs fingerprint is unchanged, skip")
+
+        self._fingerprint = fingerprint
+        return fingerprint
+
+    def close(self) -> None:
+        if self._inotify:
+            self._inotify.close()
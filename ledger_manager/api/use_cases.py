@@ -1,15 +1,29 @@
 import itertools
 import typing as t
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from datetime import datetime
+from pathlib import Path
 
 import arrow
 from loguru import logger
 
-from ledger_manager.console import console
-
+from . import analytics
 from .config import AppConfig
-from .models import AggregationType, Consts, ExchangeRate, FloorType
-from .services import ExchangeRatesClient, LedgerClient, LedgerCmd, PriceDB
+from .models import (
+    AggregationType,
+    BatchResult,
+    Consts,
+    ExchangeRate,
+    FloorType,
+    JournalResult,
+    OutputFormat,
+    ReportSpec,
+    StandardReport,
+)
+from .services import LedgerClient, LedgerClientException, LedgerCmd, PriceDB
+
+if t.TYPE_CHECKING:
+    from .services.export import ExportStats
 
 EPOCH_BEGIN = arrow.get(1980, 1, 1)
 
@@ -18,93 +32,388 @@ def get_leger_end_day() -> arrow.Arrow:
     return arrow.now().floor('days').shift(days=1)
 
 
+def report_period(
+    begin: t.Optional[datetime] = None,
+    end: t.Optional[datetime] = None,
+    floor: t.Optional[FloorType] = None,
+) -> tuple[arrow.Arrow, arrow.Arrow]:
+    """Report begin and end. Begin defaults to the `floor` period start, or to the epoch begin."""
+    end_arrow = arrow.get(end) if end else get_leger_end_day()
+
+    if not begin:
+        if floor:
+            begin_arrow = end_arrow.floor(floor.value)  # type: ignore
+        else:
+            begin_arrow = EPOCH_BEGIN
+    else:
+        begin_arrow = arrow.get(begin)
+
+    return begin_arrow, end_arrow
+
+
 def forward(
     *args,
     config: AppConfig,
+    client: t.Optional[LedgerClient] = None,
     patterns: t.Optional[t.List[str]] = None,
-):
-    client = LedgerClient.from_config(config)
+) -> str:
+    client = client or LedgerClient.from_config(config)
     patterns = patterns or []
 
-    output = LedgerCmd(client).add_accounts(*patterns).add_arguments(*args).call()
-
-    console.print(output)
+    return LedgerCmd(client).add_accounts(*patterns).add_arguments(*args).call()
 
 
 def balance(
     *args,
     config: AppConfig,
+    client: t.Optional[LedgerClient] = None,
     patterns: t.Optional[t.List[str]] = None,
     end: t.Optional[datetime] = None,
     floor: t.Optional[FloorType] = None,
     begin: t.Optional[datetime] = None,
+    exchange: t.Optional[t.Union[str, t.List[str]]] = None,
     **options: t.Any,
-):
-    client = LedgerClient.from_config(config)
-    end_arrow = arrow.get(end) if end else get_leger_end_day()
+) -> str:
+    """Ledger balance report.
+
+    Several `exchange` currencies are handled by `revaluate` instead of a ledger run per currency.
+    """
+    exchange = [exchange] if isinstance(exchange, str) else exchange or []
+
+    if len(exchange) > 1:
+        return revaluate(
+            *args,
+            config=config,
+            client=client,
+            patterns=patterns,
+            end=end,
+            floor=floor,
+            begin=begin,
+            exchange=exchange,
+            **options,
+        )
+
+    client = client or LedgerClient.from_config(config)
+    begin_arrow, end_arrow = report_period(begin, end, floor)
     patterns = patterns or []
 
-    if not begin:
-        if floor:
-            begin_arrow = end_arrow.floor(floor.value)  # type: ignore
-        else:
-            begin_arrow = EPOCH_BEGIN
-    else:
-        begin_arrow = arrow.get(begin)
-
-    output = LedgerCmd(client).add_arguments("balance", *args).add_accounts(*patterns).add_options(
+    return LedgerCmd(client).add_arguments("balance", *args).add_accounts(*patterns).add_options(
         begin=begin_arrow.datetime.strftime(Consts.DATE_FORMAT),
         end=end_arrow.datetime.strftime(Consts.DATE_FORMAT),
+        exchange=exchange[0] if exchange else None,
         **options,
     ).call()
 
-    console.print(output)
+
+def account_tree(
+    *args,
+    config: AppConfig,
+    client: t.Optional[LedgerClient] = None,
+    price_db: t.Optional[PriceDB] = None,
+    end: t.Optional[datetime] = None,
+    floor: t.Optional[FloorType] = None,
+    begin: t.Optional[datetime] = None,
+    exchange: t.Optional[str] = None,
+    **options: t.Any,
+) -> analytics.AccountTree:
+    """Balances of all the accounts for the period as a tree, built from a single flat ledger balance call.
+
+    The call doesn't depend on accounts filters or `exchange`, so e.g. budget and expenses of the same month share
+    its result in the ledger client caches. With `exchange` the accounts balances are converted in Python with
+    the price DB rates of the day before the report end, like `revaluate` does.
+    """
+    client = client or LedgerClient.from_config(config)
+    begin_arrow, end_arrow = report_period(begin, end, floor)
+
+    # Own amounts of every account, `--empty` keeps accounts whose own amount is cancelled by their children
+    cmd = LedgerCmd(client).add_arguments("balance", "--flat", "--empty", *args)
+    amounts = list(
+        cmd.add_options(
+            begin=begin_arrow.datetime.strftime(Consts.DATE_FORMAT),
+            end=end_arrow.datetime.strftime(Consts.DATE_FORMAT),
+            **options,
+        ).balances())
+    balances = analytics.account_balances(amounts)
+
+    if exchange:
+        price_db = price_db or PriceDB.from_config(config)
+        target = config.exchange_rates_api_settings.currency_aliases.get(exchange, exchange)
+        date = end_arrow.shift(days=-1).date()
+        balances = analytics.exchange_balances(balances, price_db.rate_matrix(), target, date)
+
+    return analytics.AccountTree(balances, analytics.amount_styles(amounts))
+
+
+def balance_tree(
+    *args,
+    config: AppConfig,
+    client: t.Optional[LedgerClient] = None,
+    patterns: t.Optional[t.List[str]] = None,
+    depth: t.Optional[int] = None,
+    end: t.Optional[datetime] = None,
+    floor: t.Optional[FloorType] = None,
+    begin: t.Optional[datetime] = None,
+    exchange: t.Optional[t.Union[str, t.List[str]]] = None,
+    **options: t.Any,
+) -> str:
+    """Balance report rendered from the accounts tree (see `account_tree`).
+
+    Accounts patterns and depth are applied in Python, several `exchange` currencies are handled by `revaluate`.
+    """
+    exchange = [exchange] if isinstance(exchange, str) else exchange or []
+
+    if len(exchange) > 1:
+        return revaluate(
+            *args,
+            config=config,
+            client=client,
+            patterns=patterns,
+            depth=depth,
+            end=end,
+            floor=floor,
+            begin=begin,
+            exchange=exchange,
+            **options,
+        )
+
+    tree = account_tree(
+        *args,
+        config=config,
+        client=client,
+        end=end,
+        floor=floor,
+        begin=begin,
+        exchange=exchange[0] if exchange else None,
+        **options,
+    )
+
+    return (tree.filter(*patterns) if patterns else tree).render(depth)
+
+
+def revaluate(
+    *args,
+    config: AppConfig,
+    exchange: t.List[str],
+    client: t.Optional[LedgerClient] = None,
+    price_db: t.Optional[PriceDB] = None,
+    patterns: t.Optional[t.List[str]] = None,
+    depth: t.Optional[int] = None,
+    end: t.Optional[datetime] = None,
+    floor: t.Optional[FloorType] = None,
+    begin: t.Optional[datetime] = None,
+    **options: t.Any,
+) -> str:
+    """Account balances converted to several currencies at once.
+
+    Balances are taken in their native commodities from the accounts tree (see `account_tree`), filtered and cut
+    to `depth` like `balance_tree` does, and converted in Python with the price DB rates matrix (rates of the day
+    before the report end).
+    """
+    price_db = price_db or PriceDB.from_config(config)
+    _, end_arrow = report_period(begin, end, floor)
+    aliases = config.exchange_rates_api_settings.currency_aliases
+    targets = [aliases.get(currency, currency) for currency in exchange]
+
+    tree = account_tree(*args, config=config, client=client, end=end, floor=floor, begin=begin, **options)
+    balances = (tree.filter(*patterns) if patterns else tree).depth_balances(depth)
+    date = end_arrow.shift(days=-1).date()
+
+    return analytics.render_revaluation(balances, price_db.rate_matrix(), targets, date, tree.styles)
 
 
 def average(
     *args,
     config: AppConfig,
+    client: t.Optional[LedgerClient] = None,
     patterns: t.Optional[t.List[str]] = None,
     end: t.Optional[datetime] = None,
     floor: t.Optional[FloorType] = None,
     begin: t.Optional[datetime] = None,
-    aggregation: t.Optional[AggregationType] = None,
+    aggregations: t.Optional[t.List[AggregationType]] = None,
+    rolling: t.Optional[int] = None,
     **options: t.Any,
-):
-    client = LedgerClient.from_config(config)
-    end_arrow = arrow.get(end) if end else get_leger_end_day()
+) -> str:
+    """Averaged period totals for all the aggregations.
+
+    Register is exported by a single ledger call, every aggregation is computed from it in Python.
+    """
+    client = client or LedgerClient.from_config(config)
+    begin_arrow, end_arrow = report_period(begin, end, floor)
     patterns = patterns or []
 
-    if not aggregation:
+    if not aggregations:
         if floor:
-            aggregation = floor.aggregation_type()
+            aggregations = [floor.aggregation_type()]
         else:
-            aggregation = AggregationType.daily
+            aggregations = [AggregationType.daily]
 
-    if not begin:
-        if floor:
-            begin_arrow = end_arrow.floor(floor.value)  # type: ignore
-        else:
-            begin_arrow = EPOCH_BEGIN
-    else:
-        begin_arrow = arrow.get(begin)
+    postings = list(
+        LedgerCmd(client).add_arguments("register", *args).add_accounts(*patterns).add_options(
+            begin=begin_arrow.datetime.strftime(Consts.DATE_FORMAT),
+            end=end_arrow.datetime.strftime(Consts.DATE_FORMAT),
+            **options,
+        ).postings())
 
-    output = LedgerCmd(client).add_arguments(
-        "register",
-        aggregation.to_option(),
-        "--average",
-        "--collapse",
-        *args,
-    ).add_accounts(*patterns).add_options(
-        begin=begin_arrow.datetime.strftime(Consts.DATE_FORMAT),
-        end=end_arrow.datetime.strftime(Consts.DATE_FORMAT),
-        **options,
-    ).call()
-    console.print(output)
+    aggregations = list(dict.fromkeys(aggregations))
+    totals = analytics.aggregate(postings, aggregations)
+    styles = analytics.commodity_styles(postings)
+
+    return "\n".join(
+        analytics.render_averages(
+            aggregation,
+            analytics.averages(totals[aggregation], aggregation, begin_arrow.date(), end_arrow.date(), rolling),
+            rolling,
+            styles,
+        ) for aggregation in aggregations)
+
+
+def trend(
+    *args,
+    config: AppConfig,
+    client: t.Optional[LedgerClient] = None,
+    patterns: t.Optional[t.List[str]] = None,
+    end: t.Optional[datetime] = None,
+    floor: t.Optional[FloorType] = None,
+    begin: t.Optional[datetime] = None,
+    aggregation: AggregationType = AggregationType.monthly,
+    output_format: OutputFormat = OutputFormat.table,
+    depth: t.Optional[int] = None,
+    **options: t.Any,
+) -> str:
+    """Accounts x periods matrix of totals, built from a single ledger register call.
+
+    Postings are binned by periods and accounts are cut to `depth` in Python: periodic register rows can't be
+    formatted for accounts holding several commodities.
+    """
+    client = client or LedgerClient.from_config(config)
+    begin_arrow, end_arrow = report_period(begin, end, floor)
+    patterns = patterns or []
+
+    cmd = LedgerCmd(client).add_arguments("register", *args).add_accounts(*patterns)
+    postings = list(
+        cmd.add_options(
+            begin=begin_arrow.datetime.strftime(Consts.DATE_FORMAT),
+            end=end_arrow.datetime.strftime(Consts.DATE_FORMAT),
+            **options,
+        ).postings())
 
+    matrix = analytics.trend_matrix(postings, aggregation, begin_arrow.date(), end_arrow.date(), depth)
+    return analytics.render_trend(matrix, output_format, analytics.commodity_styles(postings))
+
+
+def run_spec(spec: ReportSpec, config: AppConfig, client: LedgerClient) -> BatchResult:
+    use_case = REPORT_USE_CASES[spec.use_case]
+    options = spec.dict(exclude={"name", "use_case", "args", "output"}, exclude_none=True)
+
+    try:
+        output = use_case(*spec.args, config=config, client=client, **options)
+    except LedgerClientException as exc:
+        return BatchResult(name=spec.name, use_case=spec.use_case, error=str(exc))
+    except Exception as exc:
+        # A failed spec (e.g. missing file or exchange rates API error) mustn't abort the other specs
+        logger.opt(exception=exc).debug("Spec {} failed", spec.name)
+        return BatchResult(name=spec.name, use_case=spec.use_case, error=f"{exc.__class__.__qualname__}: {exc}")
+
+    return BatchResult(name=spec.name, use_case=spec.use_case, output=output)
+
+
+def batch(
+    specs: list[ReportSpec],
+    config: AppConfig,
+    client: t.Optional[LedgerClient] = None,
+    jobs: int = 1,
+) -> t.Iterator[BatchResult]:
+    """Run report specs in a thread pool, yield results in specs order.
 
-def update_price_db(config: AppConfig):
-    price_db = PriceDB.from_config(config)
+    Specs share config and ledger client, so accounts list is fetched once and equal ledger calls are reused.
+    """
+    client = client or LedgerClient.from_config(config, cache_results=True)
+
+    with ThreadPoolExecutor(max_workers=max(jobs, 1)) as executor:
+        yield from executor.map(lambda spec: run_spec(spec, config, client), specs)
+
+
+def prewarm_reports(config: AppConfig, reports: t.Optional[list[StandardReport]] = None) -> list[BatchResult]:
+    """Run standard reports (configured ones by default) to store their ledger results.
+
+    Interactive runs of the reports get the stored results while the journal and price DB are unchanged.
+    Results of the previous inputs are removed.
+    """
+    from .services import ResultStore
+
+    store = ResultStore.from_config(config)
+    client = LedgerClient.from_config(config, cache_results=True, result_store=store)
+    store.prune(client.inputs.fingerprint())
+
+    specs = [STANDARD_REPORTS[report] for report in reports or config.prewarm_reports]
+    return list(batch(specs, config, client, jobs=len(specs)))
+
+
+def _journal_batch(journal: str, config: AppConfig, specs: list[ReportSpec]) -> list[JournalResult]:
+    return [JournalResult(journal=journal, **result.dict()) for result in batch(specs, config)]
+
+
+def _journal_update_price_db(journal: str, config: AppConfig) -> JournalResult:
+    from .services import ExchangeRatesAPIException
+
+    name = use_case = "update_price_db"
+
+    try:
+        added = update_price_db(config)
+    except ExchangeRatesAPIException as exc:
+        return JournalResult(journal=journal, name=name, use_case=use_case, error=str(exc))
+    except Exception as exc:
+        # A failed journal (e.g. network or price DB file error) mustn't abort the other journals
+        logger.opt(exception=exc).debug("Price DB update of {} failed", journal)
+        error = f"{exc.__class__.__qualname__}: {exc}"
+        return JournalResult(journal=journal, name=name, use_case=use_case, error=error)
+
+    output = f"Added {added} rows to {config.price_db_settings.path}"
+    return JournalResult(journal=journal, name=name, use_case=use_case, output=output)
+
+
+def multi_journal(
+    configs: dict[str, AppConfig],
+    specs: list[ReportSpec],
+    update_db: bool = False,
+    jobs: t.Optional[int] = None,
+) -> t.Iterator[JournalResult]:
+    """Run report specs for many journals in a process pool, yield results in journals order, then specs order.
+
+    `configs` maps config file names to their configs. With `update_db` price DBs are updated before the reports,
+    journals sharing a price DB update it once.
+    """
+    with ProcessPoolExecutor(max_workers=jobs) as executor:
+        if update_db:
+            price_dbs: dict[Path, tuple[str, AppConfig]] = {}
+            for journal, config in configs.items():
+                price_dbs.setdefault(config.price_db_settings.path, (journal, config))
+
+            yield from executor.map(_journal_update_price_db, *zip(*price_dbs.values()))
+
+        if specs:
+            results = executor.map(_journal_batch, configs.keys(), configs.values(), itertools.repeat(specs))
+            yield from itertools.chain.from_iterable(results)
+
+
+def export_sqlite(
+    db_path: Path,
+    config: AppConfig,
+    client: t.Optional[LedgerClient] = None,
+    force: bool = False,
+) -> "ExportStats":
+    """Export journal transactions and postings to SQLite DB, applying only changed transactions."""
+    from .services import SQLiteExport
+
+    client = client or LedgerClient.from_config(config)
+    return SQLiteExport(db_path, client).export(force=force)
+
+
+def update_price_db(config: AppConfig, price_db: t.Optional[PriceDB] = None) -> int:
+    """Add missing exchange rates to the price DB. Returns number of added rows."""
+    from .services import ExchangeRatesClient
+
+    price_db = price_db or PriceDB.from_config(config)
     exchange_api = ExchangeRatesClient.from_config(config)
 
     intervals = prepare_date_intervals(
@@ -114,9 +423,13 @@ def update_price_db(config: AppConfig):
     )
 
     logger.debug("Update price DB for intervals: {}", intervals)
+    added = 0
+
     for interval in intervals:
         rows = exchange_api.get_rates(*interval)
-        price_db.append_rows(rows)
+        added += price_db.append_rows(rows)
+
+    return added
 
 
 def prepare_date_intervals(
@@ -152,3 +465,35 @@ def split_by_year(region: tuple[datetime, datetime]) -> list[tuple[datetime, dat
 
     intervals.append((dt.datetime, to_date.datetime))
     return intervals
+
+
+STANDARD_REPORTS: dict[StandardReport, ReportSpec] = {
+    StandardReport(spec.name): spec
+    for spec in [
+        ReportSpec(
+            name="assets",
+            use_case="balance_tree",
+            patterns=["^Assets(?!:Budget).*"],
+        ),
+        ReportSpec(
+            name="budget",
+            use_case="balance_tree",
+            patterns=["^Assets:Budget:Unbudgeted$", "^Assets:Budget:Expenses.*$"],
+            depth=4,
+            floor=FloorType.month,
+        ),
+        ReportSpec(
+            name="expenses",
+            use_case="balance_tree",
+            patterns=["^Expenses.*"],
+            floor=FloorType.month,
+        ),
+    ]
+}
+
+REPORT_USE_CASES: dict[str, t.Callable[..., str]] = {
+    "forward": forward,
+    "balance": balance,
+    "balance_tree": balance_tree,
+    "average": average,
+}
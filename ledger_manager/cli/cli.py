@@ -1,17 +1,31 @@
+import functools
+import subprocess
+import sys
+import time
 import typing as t
 from pathlib import Path
 
-import pydantic
 import typer
 from loguru import logger
 from rich.panel import Panel
 
-from ledger_manager.api import use_cases
-from ledger_manager.api.models import Consts
-from ledger_manager.api.services import ExchangeRatesAPIException, LedgerClientException
+from ledger_manager import profiling
+from ledger_manager.api.constants import Consts, StandardReport
 from ledger_manager.console import console
 
-from .common import CONTEXT_SETTINGS, CommonParams, ErrorHandlingTyper
+from .common import (
+    CONTEXT_SETTINGS,
+    WATCH_HELP,
+    CommonParams,
+    ErrorHandlingTyper,
+    complete_accounts,
+    journal_outputs,
+    report_profile,
+    run_use_case,
+    write_metrics,
+    write_results,
+)
+from .export import app as export_app
 from .reports import app as reports_app
 
 app = ErrorHandlingTyper(rich_markup_mode="rich")
@@ -19,49 +33,72 @@ app = ErrorHandlingTyper(rich_markup_mode="rich")
 
 @app.callback()
 def common_options(
-        ctx: typer.Context,
-        config_file: Path = typer.Option(
-            f"./{Consts.DEFAULT_CONFIG_FILE_NAME}",
-            "--config-file",
-            "-f",
-        ),
-        enable_logs: bool = typer.Option(
-            False,
-            "-v",
-            "--verbose",
-            is_flag=True,
-        ),
+    ctx: typer.Context,
+    config_file: Path = typer.Option(
+        f"./{Consts.DEFAULT_CONFIG_FILE_NAME}",
+        "--config-file",
+        "-f",
+    ),
+    enable_logs: bool = typer.Option(
+        False,
+        "-v",
+        "--verbose",
+        is_flag=True,
+    ),
+    profile: bool = typer.Option(
+        False,
+        "--profile",
+        help="Print timings of the command phases",
+    ),
+    profile_trace: t.Optional[Path] = typer.Option(
+        None,
+        "--profile-trace",
+        help="Save timings as Chrome trace",
+    ),
+    metrics_file: t.Optional[Path] = typer.Option(
+        None,
+        "--metrics-file",
+        help="Merge Prometheus metrics of the command into the file",
+    ),
 ):
     ctx.obj = CommonParams(config_file=config_file)
+    if profile or profile_trace:
+        ctx.call_on_close(functools.partial(report_profile, profiling.enable(), profile_trace))
+
+    if metrics_file:
+        ctx.call_on_close(functools.partial(write_metrics, ctx, metrics_file, time.perf_counter()))
+
     if enable_logs:
         logger.enable("ledger_manager")
         logger.debug("Debug enabled")
-
-    logger.debug("Got config: {}", ctx.obj.config.dict())
+        logger.debug("Got config: {}", ctx.obj.config.dict())
 
 
 @app.error_handler(
-    pydantic.ValidationError,
-    LedgerClientException,
-    ExchangeRatesAPIException,
+    "pydantic:ValidationError",
+    "ledger_manager.api.services.ledger:LedgerClientException",
+    "ledger_manager.api.services.apilayer:ExchangeRatesAPIException",
 )
-def validation_error_handler(error: pydantic.ValidationError) -> int:
+def validation_error_handler(error: Exception) -> int:
     console.print(Panel(str(error), border_style="red", title=error.__class__.__qualname__))
     return 1
 
 
 app.add_typer(reports_app, name="reports", no_args_is_help=True)
+app.add_typer(export_app, name="export", no_args_is_help=True)
 
 
 @app.command(context_settings=CONTEXT_SETTINGS)
 def forward(
-    ctx: typer.Context,
-    ledger_args: t.Optional[t.List[str]] = typer.Argument(None, help="Ledger CLI arguments"),
-    filter_patterns: t.Optional[t.List[str]] = typer.Option(
-        None,
-        "-f",
-        help="Use it instead of Ledger cmd args for extended regexes",
-    ),
+        ctx: typer.Context,
+        ledger_args: t.Optional[t.List[str]] = typer.Argument(None, help="Ledger CLI arguments"),
+        filter_patterns: t.Optional[t.List[str]] = typer.Option(
+            None,
+            "-f",
+            help="Use it instead of Ledger cmd args for extended regexes",
+            autocompletion=complete_accounts,
+        ),
+        watch: bool = typer.Option(False, "--watch", help=WATCH_HELP),
 ):
     """Forward commands to Ledger.
 
@@ -70,13 +107,16 @@ def forward(
         - price DB file from config
         - python-style regexes for accounts (if specified by the -f option)
     """
-    common_params: CommonParams = ctx.obj
+    from ledger_manager.api import use_cases
+
     ledger_args = ledger_args or []
 
-    use_cases.forward(
+    run_use_case(
+        ctx,
+        use_cases.forward,
         *ledger_args,
-        config=common_params.config,
         patterns=filter_patterns,
+        watch=watch,
     )
 
 
@@ -90,11 +130,129 @@ def update_db(ctx: typer.Context):
     - Uses configured main currency, currency list to sync, and currency aliases
     - Uses [blue]https://api.apilayer.com/exchangerates_data[/blue] API for exchange rates
     - [red]API key required![/red]
+    - Starts background pre-warm of configured [blue]prewarm_reports[/blue]
     """
+    from ledger_manager.api import use_cases
+
     common_params: CommonParams = ctx.obj
 
     use_cases.update_price_db(config=common_params.config)
 
+    if common_params.config.prewarm_reports:
+        # Detached, so the reports are computed after this command exits
+        subprocess.Popen(
+            [sys.executable, "-m", "ledger_manager", "--config-file",
+             str(common_params.config_file), "prewarm"],
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            start_new_session=True,
+        )
+
+
+@app.command()
+def prewarm(
+        ctx: typer.Context,
+        reports: t.Optional[t.List[StandardReport]] = typer.Argument(None, help="Reports [default: from config]"),
+):
+    """Compute standard reports and store their results.
+
+    [blue]reports assets[/blue], [blue]budget[/blue] and [blue]expenses[/blue] use the stored results
+    while the journal and price DB are unchanged.
+    Configured [blue]prewarm_reports[/blue] are pre-warmed in background after [blue]update-db[/blue].
+    """
+    from ledger_manager.api import use_cases
+
+    common_params: CommonParams = ctx.obj
+    write_results((None, result) for result in use_cases.prewarm_reports(common_params.config, reports))
+
+
+@app.command()
+def batch(
+        ctx: typer.Context,
+        specs_file: Path = typer.Argument(..., exists=True, dir_okay=False, help="YAML file with report specs"),
+        jobs: int = typer.Option(1, "--jobs", "-j", min=1, help="Number of specs run concurrently"),
+        jsonl: t.Optional[Path] = typer.Option(None, "--jsonl", help="JSON lines output file [default: stdout]"),
+):
+    """Run many report specs in one process.
+
+    Each spec sets use case ([blue]forward[/blue], [blue]balance[/blue], [blue]balance_tree[/blue] or
+    [blue]average[/blue]), patterns, args, begin/end/floor, aggregation, depth and exchange.
+    Specs share config, accounts list and equal ledger results.
+    Spec result goes to its `output` file if set, otherwise to the JSON lines stream.
+    """
+    from ledger_manager.api import use_cases
+    from ledger_manager.api.models import ReportSpec
+
+    common_params: CommonParams = ctx.obj
+    specs = ReportSpec.from_file(specs_file)
+    results = use_cases.batch(specs, config=common_params.config, jobs=jobs)
+
+    write_results(((spec.output, result) for spec, result in zip(specs, results)), jsonl)
+
+
+@app.command()
+def multi(
+        config_files: t.List[Path] = typer.Argument(..., exists=True, dir_okay=False, help="Journal config files"),
+        specs_file: t.Optional[Path] = typer.Option(
+            None,
+            "--specs",
+            exists=True,
+            dir_okay=False,
+            help="YAML file with report specs",
+        ),
+        update_db: bool = typer.Option(False, "--update-db", help="Update price DBs before the reports"),
+        jobs: t.Optional[int] = typer.Option(None, "--jobs", "-j", min=1, help="Number of processes [default: CPUs]"),
+        jsonl: t.Optional[Path] = typer.Option(None, "--jsonl", help="JSON lines output file [default: stdout]"),
+):
+    """Run report specs and/or price DB update for many journals in a process pool.
+
+    Each config file configures a journal, configs are merged with envvars, appdir and builtin defaults.
+    Price DB shared by several journals is updated once. Results are written in config files order, then specs order.
+    Relative spec `output` paths are resolved against `<config dir>/<config stem>/`.
+    """
+    from ledger_manager.api import use_cases
+    from ledger_manager.api.config import load_config
+    from ledger_manager.api.models import ReportSpec
+
+    if not specs_file and not update_db:
+        raise typer.BadParameter("Set report specs or --update-db")
+
+    specs = ReportSpec.from_file(specs_file) if specs_file else []
+    outputs = journal_outputs(config_files, specs)
+    configs = {str(path): load_config(path) for path in config_files}
+
+    results = use_cases.multi_journal(configs, specs, update_db=update_db, jobs=jobs)
+    write_results(((outputs.get((r.journal, r.name)), r) for r in results), jsonl)
+
+
+@app.command()
+def serve(
+        ctx: typer.Context,
+        socket_path: t.Optional[Path] = typer.Option(None, "--socket", help="Unix socket path [default: in app dir]"),
+        jobs: int = typer.Option(4, "--jobs", "-j", min=1, help="Number of use cases run concurrently"),
+):
+    """Serve use cases over a local Unix socket.
+
+    Accepts newline-delimited JSON requests with [blue]forward[/blue], [blue]balance[/blue],
+    [blue]balance_tree[/blue], [blue]average[/blue] or [blue]update_price_db[/blue] use case
+    and the same fields as batch specs,
+    [blue]metrics[/blue] request returns the server metrics in Prometheus text format.
+    Keeps config, accounts list and price DB warm between requests.
+    """
+    from ledger_manager.api.config import SOCKET_PATH
+    from ledger_manager.server import serve
+
+    common_params: CommonParams = ctx.obj
+    socket_path = socket_path or SOCKET_PATH
+
+    console.print(f"Listening on [blue]{socket_path}[/blue]")
+
+    try:
+        serve(common_params.config, socket_path, jobs=jobs)
+    except KeyboardInterrupt:
+        pass
+
 
 @app.command()
 def show_config(ctx: typer.Context):
@@ -1,16 +1,32 @@
+import collections
 import functools
+import importlib
+import os
 import sys
+import time
 import typing as t
 from dataclasses import dataclass
+from datetime import datetime
 from pathlib import Path
 from typing import Callable
 
 import typer
+from rich.console import Console
+from rich.panel import Panel
 
-from ledger_manager.api.config import AppConfig
+from ledger_manager import metrics, profiling
+from ledger_manager.api.constants import Consts
+from ledger_manager.console import console, print_output
+
+if t.TYPE_CHECKING:
+    from ledger_manager.api.config import AppConfig
+    from ledger_manager.api.models import BatchResult, ReportSpec
 
 CONTEXT_SETTINGS = {"ignore_unknown_options": True, "allow_extra_args": True}
-ExceptionType = t.Type[Exception]
+WATCH_HELP = "Re-run on transactions, includes or price DB changes"
+EXCHANGE_HELP = "Currency to convert to. Several currencies (repeated or comma separated) are converted in one pass"
+# Exception class or its "module:ClassName" path, resolved lazily to keep heavy modules unimported
+ExceptionType = t.Type[Exception] | str
 ErrorHandlingCallback = Callable[[Exception], int]
 
 
@@ -31,12 +47,28 @@ class ErrorHandlingTyper(typer.Typer):
 
         return decorator
 
+    def _find_handler(self, exc_type: t.Type[Exception]) -> ErrorHandlingCallback:
+        if exc_type in self.error_handlers:
+            return self.error_handlers[exc_type]
+
+        for key, callback in self.error_handlers.items():
+            if not isinstance(key, str):
+                continue
+
+            module_name, class_name = key.split(":")
+
+            # Exception can't be raised by the module that was never imported
+            if module_name in sys.modules and getattr(importlib.import_module(module_name), class_name) is exc_type:
+                return callback
+
+        raise KeyError(exc_type)
+
     def __call__(self, *args, **kwargs):
         try:
             super().__call__(*args, **kwargs)
         except Exception as e:
             try:
-                callback = self.error_handlers[type(e)]
+                callback = self._find_handler(type(e))
                 exit_code = callback(e)
                 raise typer.Exit(code=exit_code)
             except typer.Exit as e:
@@ -45,10 +77,147 @@ class ErrorHandlingTyper(typer.Typer):
                 raise e
 
 
+def split_values(values: t.Optional[t.List[str]]) -> t.List[str]:
+    """Flatten repeated and comma separated option values."""
+    return [v.strip() for value in values or [] for v in value.split(",") if v.strip()]
+
+
+def report_profile(profiler: profiling.Profiler, trace_path: t.Optional[Path] = None) -> None:
+    """Print profile summary to stderr (to keep stdout for the report) and write trace file."""
+    Console(stderr=True).print(profiler.summary())
+
+    if trace_path:
+        profiler.write_trace(trace_path)
+        Console(stderr=True).print(f"Trace is written to [blue]{trace_path}[/blue]")
+
+    profiling.disable()
+
+
+def complete_accounts(ctx: typer.Context, incomplete: str) -> t.List[str]:
+    """Account patterns completion. Saves the accounts index, so next completions take the fast path."""
+    from ledger_manager import completion
+    from ledger_manager.api.config import AppConfig, load_config
+    from ledger_manager.api.services import LedgerClient, LedgerClientException
+
+    config_file = Path(ctx.find_root().params.get("config_file") or f"./{Consts.DEFAULT_CONFIG_FILE_NAME}")
+
+    try:
+        config = load_config(config_file)
+        accounts = LedgerClient.from_config(config).accounts()
+        index = completion.AccountIndex.build(config_file, AppConfig.__fields__, config.transactions_path, accounts)
+        index.save(completion.index_path(config_file))
+    except (ValueError, OSError, LedgerClientException):
+        return []
+
+    return completion.complete_accounts(accounts, incomplete)
+
+
+def write_metrics(ctx: typer.Context, path: Path, started: float) -> None:
+    """Record the command run and merge the metrics into the Prometheus text format file."""
+    common_params: CommonParams = ctx.obj
+    command = common_params.command or ctx.invoked_subcommand or ""
+
+    metrics.COMMAND_DURATION.set(time.perf_counter() - started, command=command)
+    metrics.COMMAND_TIMESTAMP.set(time.time(), command=command)
+    metrics.REGISTRY.write(path)
+
+
+def write_results(results: t.Iterable[tuple[t.Optional[Path], "BatchResult"]], jsonl: t.Optional[Path] = None):
+    """Write results to their output files if set, otherwise to the JSON lines stream. Exit with 1 if any failed."""
+    stream = open(jsonl, "w") if jsonl else sys.stdout
+    failed = False
+
+    try:
+        for output, result in results:
+            failed = failed or bool(result.error)
+
+            if output and result.output is not None:
+                output.parent.mkdir(parents=True, exist_ok=True)
+                output.write_text(result.output)
+                continue
+
+            stream.write(f"{result.json()}\n")
+            stream.flush()
+
+    finally:
+        if jsonl:
+            stream.close()
+
+    if failed:
+        raise typer.Exit(code=1)
+
+
+def journal_outputs(config_files: t.Sequence[Path], specs: t.Sequence["ReportSpec"]) -> dict[tuple[str, str], Path]:
+    """Output files of (config file, spec name) results, relative spec outputs go to `<config dir>/<config stem>/`.
+
+    Fails if results of several journals would be written to the same file (e.g. an absolute spec output).
+    """
+    outputs = {(str(config_file), spec.name): config_file.parent / config_file.stem / spec.output
+               for config_file in config_files for spec in specs if spec.output}
+
+    paths = collections.Counter(os.path.abspath(path) for path in outputs.values())
+    duplicates = sorted(path for path, count in paths.items() if count > 1)
+    if duplicates:
+        raise typer.BadParameter(f"Results of several journals are written to {', '.join(duplicates)}")
+
+    return outputs
+
+
 @dataclass
 class CommonParams:
     config_file: Path
+    # Invoked command path (e.g. `reports balance`), set by use case commands
+    command: str = ""
+
+    @functools.cached_property
+    def config(self) -> "AppConfig":
+        from ledger_manager.api.config import load_config
+
+        return load_config(self.config_file)
+
+
+def run_use_case(
+    ctx: typer.Context,
+    use_case: Callable[..., t.Any],
+    *args: t.Any,
+    watch: bool = False,
+    stored_results: bool = False,
+    **kwargs: t.Any,
+):
+    """Run use case once, or re-run it on every change of its inputs if `watch` is set.
+
+    Config and ledger client are built once and reused by all the runs.
+    With `stored_results` ledger results pre-warmed for the current inputs are used (see `prewarm` command).
+    """
+    from ledger_manager.api.services import LedgerClient, ResultStore
+    from ledger_manager.api.services.watcher import InputWatcher
+
+    common_params: CommonParams = ctx.obj
+    common_params.command = ctx.command_path.partition(" ")[2]
+    config = common_params.config
+    client = LedgerClient.from_config(config, result_store=ResultStore.from_config(config) if stored_results else None)
+    run = functools.partial(use_case, *args, config=config, client=client, **kwargs)
+
+    if not watch:
+        print_output(run())
+        return
+
+    watcher = InputWatcher(client.inputs)
+
+    try:
+        while True:
+            console.rule(f"[grey69]{datetime.now():%H:%M:%S}")
+
+            # Any failure (e.g. of a half-saved journal) is shown until the next change, not ending the watch
+            try:
+                print_output(run())
+            except Exception as exc:
+                console.print(Panel(str(exc), border_style="red", title=exc.__class__.__qualname__))
+
+            watcher.wait()
+
+    except KeyboardInterrupt:
+        pass
 
-    @property
-    def config(self) -> AppConfig:
-        return AppConfig.from_file(self.config_file)
+    finally:
+        watcher.close()
@@ -0,0 +1,29 @@
+from pathlib import Path
+
+import typer
+
+from ledger_manager.console import console
+
+from .common import CommonParams
+
+app = typer.Typer(help="Export journal data.")
+
+
+@app.command()
+def sqlite(
+        ctx: typer.Context,
+        db_path: Path = typer.Argument(..., dir_okay=False, help="SQLite DB file"),
+        force: bool = typer.Option(False, "--force", help="Compare all the transactions even if journal is unchanged"),
+):
+    """Export transactions and postings to SQLite DB.
+
+    Creates [blue]transactions[/blue], [blue]postings[/blue] (with account hierarchy and commodity columns)
+    and [blue]accounts[/blue] tables. Later exports read the whole register again but write only
+    the transactions added or changed since the last export, and do nothing while the journal files are unchanged.
+    """
+    from ledger_manager.api import use_cases
+
+    common_params: CommonParams = ctx.obj
+    stats = use_cases.export_sqlite(db_path, config=common_params.config, force=force)
+
+    console.print(f"Added {stats.added}, removed {stats.removed}, unchanged {stats.unchanged} transactions")
@@ -3,10 +3,9 @@ from datetime import datetime
 
 import typer
 
-from ledger_manager.api import use_cases
-from ledger_manager.api.models import AggregationType, Consts, FloorType
+from ledger_manager.api.constants import AggregationType, Consts, FloorType, OutputFormat, StandardReport
 
-from .common import CommonParams
+from .common import EXCHANGE_HELP, WATCH_HELP, complete_accounts, run_use_case, split_values
 
 app = typer.Typer(help="Custom reports.")
 
@@ -14,108 +13,169 @@ app = typer.Typer(help="Custom reports.")
 @app.command(context_settings={"ignore_unknown_options": True})
 def balance(
         ctx: typer.Context,
-        patterns: t.Optional[t.List[str]] = typer.Argument(None),
-        end: datetime = typer.Option(use_cases.get_leger_end_day().datetime, formats=[Consts.DATE_FORMAT]),
+        patterns: t.Optional[t.List[str]] = typer.Argument(None, autocompletion=complete_accounts),
+        end: t.Optional[datetime] = typer.Option(None, formats=[Consts.DATE_FORMAT], show_default="tomorrow"),
         floor: t.Optional[FloorType] = typer.Option(None, "--last"),
         begin: t.Optional[datetime] = typer.Option(None, formats=[Consts.DATE_FORMAT]),
-        exchange: t.Optional[str] = typer.Option(None, "--exchange", "-X"),
+        exchange: t.Optional[t.List[str]] = typer.Option(None, "--exchange", "-X", help=EXCHANGE_HELP),
+        watch: bool = typer.Option(False, "--watch", help=WATCH_HELP),
 ):
     """Current balance with Python-style regexes for accounts.
 
     Accepts begin/end parameter, or last period (set by --last option).
     """
-    common_params: CommonParams = ctx.obj
+    from ledger_manager.api import use_cases
 
-    use_cases.balance(
-        config=common_params.config,
+    run_use_case(
+        ctx,
+        use_cases.balance,
         patterns=patterns,
         end=end,
         floor=floor,
         begin=begin,
-        exchange=exchange,
+        exchange=split_values(exchange),
+        watch=watch,
     )
 
 
 @app.command()
 def assets(
         ctx: typer.Context,
-        exchange: t.Optional[str] = typer.Option(None, "--exchange", "-X"),
+        exchange: t.Optional[t.List[str]] = typer.Option(None, "--exchange", "-X", help=EXCHANGE_HELP),
+        watch: bool = typer.Option(False, "--watch", help=WATCH_HELP),
 ):
     """Current state of `Assets` accounts excluding `Assets:Budget` ones."""
 
-    common_params: CommonParams = ctx.obj
+    from ledger_manager.api import use_cases
 
-    use_cases.balance(
-        config=common_params.config,
-        patterns=["^Assets(?!:Budget).*"],
-        exchange=exchange,
+    spec = use_cases.STANDARD_REPORTS[StandardReport.assets]
+
+    run_use_case(
+        ctx,
+        use_cases.balance_tree,
+        patterns=spec.patterns,
+        exchange=split_values(exchange),
+        watch=watch,
+        stored_results=True,
     )
 
 
 @app.command()
 def expenses(
         ctx: typer.Context,
-        end: datetime = typer.Option(use_cases.get_leger_end_day().datetime, formats=[Consts.DATE_FORMAT]),
+        end: t.Optional[datetime] = typer.Option(None, formats=[Consts.DATE_FORMAT], show_default="tomorrow"),
         floor: t.Optional[FloorType] = typer.Option(FloorType.month, "--last"),
         begin: t.Optional[datetime] = typer.Option(None, formats=[Consts.DATE_FORMAT]),
-        exchange: t.Optional[str] = typer.Option(None, "--exchange", "-X"),
+        exchange: t.Optional[t.List[str]] = typer.Option(None, "--exchange", "-X", help=EXCHANGE_HELP),
+        watch: bool = typer.Option(False, "--watch", help=WATCH_HELP),
 ):
     """State of `Expenses` accounts for the given period (default is last month)."""
-    common_params: CommonParams = ctx.obj
+    from ledger_manager.api import use_cases
+
+    spec = use_cases.STANDARD_REPORTS[StandardReport.expenses]
 
-    use_cases.balance(
-        config=common_params.config,
-        patterns=["^Expenses.*"],
+    run_use_case(
+        ctx,
+        use_cases.balance_tree,
+        patterns=spec.patterns,
         end=end,
         floor=floor,
         begin=begin,
-        exchange=exchange,
+        exchange=split_values(exchange),
+        watch=watch,
+        stored_results=True,
     )
 
 
 @app.command()
 def budget(
         ctx: typer.Context,
-        exchange: t.Optional[str] = typer.Option(None, "--exchange", "-X"),
+        exchange: t.Optional[t.List[str]] = typer.Option(None, "--exchange", "-X", help=EXCHANGE_HELP),
+        watch: bool = typer.Option(False, "--watch", help=WATCH_HELP),
 ):
     """State of `Assets:Budget` accounts for the last month."""
-    common_params: CommonParams = ctx.obj
-
-    use_cases.balance(
-        "--depth",
-        "4",
-        config=common_params.config,
-        patterns=[
-            "^Assets:Budget:Unbudgeted$",
-            "^Assets:Budget:Expenses.*$",
-        ],
-        floor=FloorType.month,
-        exchange=exchange,
+    from ledger_manager.api import use_cases
+
+    spec = use_cases.STANDARD_REPORTS[StandardReport.budget]
+
+    run_use_case(
+        ctx,
+        use_cases.balance_tree,
+        patterns=spec.patterns,
+        depth=spec.depth,
+        floor=spec.floor,
+        exchange=split_values(exchange),
+        watch=watch,
+        stored_results=True,
     )
 
 
 @app.command()
 def average(
         ctx: typer.Context,
-        patterns: t.Optional[t.List[str]] = typer.Argument(None),
-        end: datetime = typer.Option(use_cases.get_leger_end_day().datetime, formats=[Consts.DATE_FORMAT]),
+        patterns: t.Optional[t.List[str]] = typer.Argument(None, autocompletion=complete_accounts),
+        end: t.Optional[datetime] = typer.Option(None, formats=[Consts.DATE_FORMAT], show_default="tomorrow"),
         floor: FloorType = typer.Option(FloorType.month, "--last"),
-        aggregation: AggregationType = typer.Option(AggregationType.daily, "--agg"),
+        aggregations: t.List[AggregationType] = typer.Option(
+            [AggregationType.daily],
+            "--agg",
+            help="Aggregation period, may be set several times",
+        ),
+        rolling: t.Optional[int] = typer.Option(None, "--rolling", min=1, help="Add rolling average over N periods"),
         begin: t.Optional[datetime] = typer.Option(None, formats=[Consts.DATE_FORMAT]),
         exchange: t.Optional[str] = typer.Option(None, "--exchange", "-X"),
+        watch: bool = typer.Option(False, "--watch", help=WATCH_HELP),
 ):
     """Averaged history for given accounts.
 
     By default uses last month transactions aggregated by day.
+    All the aggregations are computed from a single ledger register call.
+    """
+    from ledger_manager.api import use_cases
+
+    run_use_case(
+        ctx,
+        use_cases.average,
+        patterns=patterns,
+        end=end,
+        floor=floor,
+        begin=begin,
+        aggregations=aggregations,
+        rolling=rolling,
+        exchange=exchange,
+        watch=watch,
+    )
+
+
+@app.command()
+def trend(
+        ctx: typer.Context,
+        patterns: t.Optional[t.List[str]] = typer.Argument(None, autocompletion=complete_accounts),
+        end: t.Optional[datetime] = typer.Option(None, formats=[Consts.DATE_FORMAT], show_default="tomorrow"),
+        floor: FloorType = typer.Option(FloorType.year, "--last"),
+        aggregation: AggregationType = typer.Option(AggregationType.monthly, "--agg"),
+        begin: t.Optional[datetime] = typer.Option(None, formats=[Consts.DATE_FORMAT]),
+        depth: t.Optional[int] = typer.Option(None, "--depth", min=1),
+        exchange: t.Optional[str] = typer.Option(None, "--exchange", "-X"),
+        output_format: OutputFormat = typer.Option(OutputFormat.table, "--format"),
+        watch: bool = typer.Option(False, "--watch", help=WATCH_HELP),
+):
+    """Accounts by periods matrix of totals, e.g. monthly expenses trend.
+
+    By default uses current year transactions aggregated by month. Built from a single ledger call.
     """
-    common_params: CommonParams = ctx.obj
+    from ledger_manager.api import use_cases
 
-    use_cases.average(
-        config=common_params.config,
+    run_use_case(
+        ctx,
+        use_cases.trend,
         patterns=patterns,
         end=end,
         floor=floor,
         begin=begin,
         aggregation=aggregation,
+        output_format=output_format,
+        depth=depth,
         exchange=exchange,
+        watch=watch,
     )
@@ -0,0 +1,263 @@
+"""Fast shell completion of account patterns.
+
+Accounts are completed from an index persisted in the cache dir and rebuilt when the journal files change.
+Config changes are left to the full CLI, since resolving the config needs pydantic.
+This module is imported before the CLI, so it uses the standard library only: no typer/click, rich or pydantic.
+"""
+import hashlib
+import json
+import os
+import shlex
+import subprocess
+import sys
+import typing as t
+from pathlib import Path
+
+from ledger_manager.api.constants import Consts
+from ledger_manager.api.services.journal import journal_files, stat_key
+
+COMPLETE_VAR = "_LEDGER_MANAGER_COMPLETE"
+
+# Commands completing account patterns as their arguments, and options taking account patterns
+PATTERN_ARGUMENT_COMMANDS = {("reports", "balance"), ("reports", "average"), ("reports", "trend")}
+PATTERN_OPTIONS = {("forward", ): {"-f"}}
+# Options of the commands above that don't take a value
+FLAGS = {"--watch", "--help"}
+# Root options taking a value
+ROOT_OPTIONS = {"-f", "--config-file", "--profile-trace", "--metrics-file"}
+
+
+def app_dir() -> Path:
+    """Same as `click.get_app_dir(Consts.APP_NAME)`, without importing click."""
+    if sys.platform.startswith("win"):
+        return Path(os.environ.get("LOCALAPPDATA") or os.path.expanduser("~"), Consts.APP_NAME)
+
+    if sys.platform == "darwin":
+        return Path(os.path.expanduser("~/Library/Application Support"), Consts.APP_NAME)
+
+    return Path(os.environ.get("XDG_CONFIG_HOME", os.path.expanduser("~/.config")), Consts.APP_NAME)
+
+
+def config_key(config_file: Path, env_keys: t.Iterable[str]) -> str:
+    """Key of what config resolution depends on: config files stats and env vars named as config fields."""
+    sha = hashlib.sha1()
+
+    for source in (config_file, app_dir() / Consts.DEFAULT_CONFIG_FILE_NAME,
+                   Path(__file__).parent / Consts.DEFAULT_CONFIG_FILE_NAME):
+        sha.update(f"{source.absolute()}:{stat_key(source)}\n".encode())
+
+    keys = {key.lower() for key in env_keys}
+    env = sorted((k, v) for k, v in os.environ.items() if k.lower() in keys)
+    sha.update(f"{env}".encode())
+
+    return sha.hexdigest()
+
+
+def index_path(config_file: Path) -> Path:
+    name = hashlib.sha1(str(config_file.absolute()).encode()).hexdigest()
+    return app_dir() / "cache" / f"accounts-{name}.json"
+
+
+class AccountIndex(t.NamedTuple):
+    config_file: str
+    # Env vars the config is resolved from, and `config_key` when the index was built
+    env_keys: list[str]
+    config_key: str
+    transactions_path: str
+    # Journal file -> its stat when the accounts were listed
+    files: dict[str, list[int]]
+    accounts: list[str]
+
+    @classmethod
+    def build(
+        cls,
+        config_file: Path,
+        env_keys: t.Iterable[str],
+        transactions_path: Path,
+        accounts: list[str],
+    ) -> "AccountIndex":
+        env_keys = sorted(env_keys)
+        files = {str(path): list(stat_key(path) or []) for path in journal_files(transactions_path)}
+
+        return cls(
+            config_file=str(config_file),
+            env_keys=env_keys,
+            config_key=config_key(config_file, env_keys),
+            transactions_path=str(transactions_path),
+            files=files,
+            accounts=accounts,
+        )
+
+    @classmethod
+    def load(cls, path: Path) -> t.Optional["AccountIndex"]:
+        try:
+            with open(path) as fp:
+                return cls(**json.load(fp))
+        except (OSError, ValueError, TypeError):
+            return None
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+
+        with open(tmp_path, "w") as fp:
+            json.dump(self._asdict(), fp)
+
+        os.replace(tmp_path, path)
+
+    def config_changed(self) -> bool:
+        return config_key(Path(self.config_file), self.env_keys) != self.config_key
+
+    def is_fresh(self) -> bool:
+        return not self.config_changed() and all(
+            list(stat_key(Path(path)) or []) == stat for path, stat in self.files.items())
+
+    def refresh(self) -> "AccountIndex":
+        """Index with the accounts listed by ledger directly (config and price DB aren't needed for that)."""
+        transactions_path = Path(self.transactions_path)
+        output = subprocess.run(
+            ["ledger", "-f", str(transactions_path), "accounts"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+        accounts = [s.strip() for s in output.splitlines() if s.strip()]
+        return self.build(Path(self.config_file), self.env_keys, transactions_path, accounts)
+
+
+def complete_accounts(accounts: t.Iterable[str], incomplete: str) -> list[str]:
+    """Accounts and account prefixes one level deeper than `incomplete`, e.g. `Expenses:` -> `Expenses:Food`.
+
+    Leading `^` of regex patterns is kept.
+    """
+    anchor = "^" if incomplete.startswith("^") else ""
+    prefix = incomplete[len(anchor):]
+    result = set()
+
+    for account in accounts:
+        if account.startswith(prefix):
+            end = account.find(":", len(prefix) + 1)
+            result.add(anchor + (account if end < 0 else account[:end]))
+
+    return sorted(result)
+
+
+def parse_request(environ: t.Mapping[str, str]) -> t.Optional[tuple[str, list[str], str]]:
+    """Shell, arguments and incomplete word of a completion request, as typer completion scripts send them."""
+    shell = environ.get(COMPLETE_VAR, "").replace("complete_", "")
+
+    try:
+        if shell == "bash":
+            words = shlex.split(environ["COMP_WORDS"])
+            cword = int(environ["COMP_CWORD"])
+            args, parts = words[1:cword], [words[cword] if cword < len(words) else ""]
+
+            # Bash splits words by ":", join account names back
+            while args and (parts[0] == ":" or args[-1] == ":"):
+                parts.insert(0, args.pop())
+
+            return shell, args, "".join(parts)
+
+        words_line = environ.get("_TYPER_COMPLETE_ARGS", "")
+        words = shlex.split(words_line)[1:]
+
+        if shell in ("powershell", "pwsh"):
+            return shell, words, environ.get("_TYPER_COMPLETE_WORD_TO_COMPLETE", "")
+
+        if shell in ("zsh", "fish"):
+            if words and not words_line.endswith(" "):
+                return shell, words[:-1], words[-1]
+
+            return shell, words, ""
+
+    except (KeyError, ValueError):
+        return None
+
+    return None
+
+
+def is_pattern_position(args: list[str], incomplete: str) -> tuple[bool, Path]:
+    """Whether the incomplete word is an account pattern, and the config file set by the root options."""
+    config_file = Path(f"./{Consts.DEFAULT_CONFIG_FILE_NAME}")
+    i = 0
+
+    while i < len(args) and args[i].startswith("-"):
+        option, _, value = args[i].partition("=")
+
+        if option in ROOT_OPTIONS and not value and i + 1 < len(args):
+            i += 1
+            value = args[i]
+
+        if option in ("-f", "--config-file"):
+            config_file = Path(value)
+
+        i += 1
+
+    command = tuple(a for a in args[i:i + 2] if not a.startswith("-"))
+    previous = args[-1] if len(args) > i + len(command) else ""
+
+    if command[:1] in PATTERN_OPTIONS:
+        return previous in PATTERN_OPTIONS[command[:1]], config_file
+
+    if command in PATTERN_ARGUMENT_COMMANDS:
+        option_value = previous.startswith("-") and "=" not in previous and previous not in FLAGS
+        return not incomplete.startswith("-") and not option_value, config_file
+
+    return False, config_file
+
+
+def format_completions(shell: str, values: list[str]) -> str:
+    if shell == "zsh":
+        if not values:
+            return "_files"
+
+        escaped = ("\"" + v.replace('"', '""').replace("'", "''").replace("$", "\\$").replace("`", "\\`") + "\""
+                   for v in values)
+        return "_arguments '*: :((" + "\n".join(escaped) + "))'"
+
+    if shell in ("powershell", "pwsh"):
+        return "\n".join(f"{v}::: " for v in values)
+
+    return "\n".join(values)
+
+
+def fast_complete(environ: t.Mapping[str, str] = os.environ) -> bool:
+    """Answer an account pattern completion request from the index. False if the full CLI has to answer it."""
+    request = parse_request(environ)
+    if request is None:
+        return False
+
+    shell, args, incomplete = request
+    is_pattern, config_file = is_pattern_position(args, incomplete)
+    path = index_path(config_file)
+    index = AccountIndex.load(path) if is_pattern else None
+
+    if index is None:
+        return False
+
+    if not index.is_fresh():
+        # Changed config may point to other journal
+        if index.config_changed():
+            return False
+
+        try:
+            index = index.refresh()
+        except (OSError, subprocess.CalledProcessError):
+            return False
+
+        index.save(path)
+
+    values = complete_accounts(index.accounts, incomplete)
+
+    if shell == "bash":
+        # Bash replaces the part of the word after the last ":" only
+        values = [v[incomplete.rfind(":") + 1:] for v in values]
+
+    if shell == "fish":
+        action = environ.get("_TYPER_COMPLETE_FISH_ACTION", "")
+        if action == "is-args":
+            sys.exit(0 if values else 1)
+
+    sys.stdout.write(format_completions(shell, values))
+    return True
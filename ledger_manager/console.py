@@ -1,7 +1,16 @@
+import re
+
 from rich.console import Console
 from rich.highlighter import RegexHighlighter
+from rich.text import Text
 from rich.theme import Theme
 
+from ledger_manager import profiling
+
+# Outputs larger than this (in characters) are written without highlighting
+HIGHLIGHT_SIZE_LIMIT = 256 * 1024
+HIGHLIGHT_CHUNK_LINES = 512
+
 
 class CustomHighlighter(RegexHighlighter):
     base_style = "custom."
@@ -16,6 +25,16 @@ class CustomHighlighter(RegexHighlighter):
         r"(?P<account>\:?[A-Z][a-z]+([A-Z][a-z]*)*(\:[A-Z][a-z]+([A-Z][a-z]*)*)*|:?MIR|:?VISA)",
     ]
 
+    # All the highlights combined into a single pass tokenizer, earlier highlights take precedence.
+    # Group names are suffixed with the highlight index to make them unique.
+    tokenizer = re.compile("|".join(
+        re.sub(r"\(\?P<(\w+)>", rf"(?P<\1_{i}>", highlight, count=1) for i, highlight in enumerate(highlights)))
+
+    def highlight(self, text: Text) -> None:
+        for match in self.tokenizer.finditer(text.plain):
+            style = match.lastgroup.rsplit("_", 1)[0]  # type: ignore
+            text.stylize(f"{self.base_style}{style}", match.start(), match.end())
+
 
 theme = Theme({
     "custom.date": "magenta",
@@ -27,4 +46,32 @@ theme = Theme({
 
 console = Console(highlighter=CustomHighlighter(), theme=theme)
 
-__all__ = ["console"]
+
+def print_output(output: str, size_limit: int = HIGHLIGHT_SIZE_LIMIT) -> None:
+    """Print command output (e.g. Ledger report).
+
+    Output is highlighted chunk by chunk, so the first lines are shown before the whole output is processed.
+    Highlighting is skipped if stdout is not a terminal or output is too large.
+    """
+    if not output.endswith("\n"):
+        output += "\n"
+
+    with profiling.span("render", "render", bytes=len(output)):
+        if not console.is_terminal or len(output) > size_limit:
+            console.file.write(output)
+            console.file.flush()
+            return
+
+        lines = output.splitlines(keepends=True)
+
+        for i in range(0, len(lines), HIGHLIGHT_CHUNK_LINES):
+            console.print(
+                "".join(lines[i:i + HIGHLIGHT_CHUNK_LINES]),
+                end="",
+                markup=False,
+                emoji=False,
+                soft_wrap=True,
+            )
+
+
+__all__ = ["console", "print_output"]
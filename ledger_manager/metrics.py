@@ -0,0 +1,241 @@
+import abc
+import math
+import os
+import re
+import threading
+import typing as t
+from pathlib import Path
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(labels: t.Sequence[tuple[str, str]]) -> str:
+    if not labels:
+        return ""
+
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+SAMPLE_RE = re.compile(r'(?P<name>[a-zA-Z_:][\w:]*)(?:\{(?P<labels>.*)\})? (?P<value>\S+)')
+LABEL_RE = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+SampleKey = tuple[str, tuple[tuple[str, str], ...]]
+
+
+def _unescape(value: str) -> str:
+    return re.sub(r"\\(.)", lambda m: "\n" if m[1] == "n" else m[1], value)
+
+
+def _parse_samples(text: str) -> dict[SampleKey, float]:
+    """Samples of a text exposition as (name, labels) -> value, comments are skipped."""
+    samples = {}
+
+    for line in text.splitlines():
+        match = SAMPLE_RE.fullmatch(line)
+        if line.startswith("#") or match is None:
+            continue
+
+        labels = tuple((name, _unescape(value)) for name, value in LABEL_RE.findall(match["labels"] or ""))
+        samples[(match["name"], labels)] = float(match["value"])
+
+    return samples
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric(abc.ABC):
+    type_name = ""
+
+    def __init__(self, name: str, help: str, labels: t.Sequence[str] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        if set(labels) != set(self.labels):
+            raise ValueError(f"Metric {self.name} expects labels {self.labels}, got {tuple(labels)}")
+
+        return tuple(str(labels[name]) for name in self.labels)
+
+    @abc.abstractmethod
+    def samples(self) -> t.Iterator[tuple[str, t.Sequence[tuple[str, str]], float]]:
+        """Samples as (name, labels, value)."""
+
+    def sample_names(self) -> tuple[str, ...]:
+        return (self.name, )
+
+    def render(self, samples: t.Optional[t.Iterable[tuple[str, t.Sequence[tuple[str, str]], float]]] = None) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.type_name}"]
+        lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}"
+                     for name, labels, value in (self.samples() if samples is None else samples))
+
+        return "\n".join(lines) + "\n"
+
+
+class Counter(Metric):
+    type_name = "counter"
+
+    def __init__(self, name: str, help: str, labels: t.Sequence[str] = ()) -> None:
+        super().__init__(name, help, labels)
+        self._values: dict[tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> t.Iterator[tuple[str, t.Sequence[tuple[str, str]], float]]:
+        with self._lock:
+            values = sorted(self._values.items())
+
+        for key, value in values:
+            yield self.name, list(zip(self.labels, key)), value
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(Metric):
+    type_name = "histogram"
+
+    def __init__(
+            self,
+            name: str,
+            help: str,
+            labels: t.Sequence[str] = (),
+            buckets: t.Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labels)
+        self.buckets = (*sorted(buckets), math.inf)
+        # labels -> (counts per bucket, sum)
+        self._values: dict[tuple[str, ...], tuple[list[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * len(self.buckets), 0.0)
+            counts[next(i for i, bound in enumerate(self.buckets) if value <= bound)] += 1
+            self._values[key] = (counts, total + value)
+
+    def sample_names(self) -> tuple[str, ...]:
+        return f"{self.name}_bucket", f"{self.name}_sum", f"{self.name}_count"
+
+    def count(self, **labels: str) -> int:
+        counts, _ = self._values.get(self._key(labels)) or ([], 0.0)
+        return sum(counts)
+
+    def samples(self) -> t.Iterator[tuple[str, t.Sequence[tuple[str, str]], float]]:
+        with self._lock:
+            values = sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+
+        for key, (counts, total) in values:
+            labels = list(zip(self.labels, key))
+            cumulative = 0
+
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f"{self.name}_bucket", [*labels, ("le", _format_value(bound))], cumulative
+
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, cumulative
+
+
+M = t.TypeVar("M", bound=Metric)
+
+
+class Registry:
+    """Process-wide metrics in Prometheus text exposition format."""
+
+    def __init__(self) -> None:
+        self.metrics: list[Metric] = []
+        # Metrics file -> samples of this process already added to it
+        self._written: dict[Path, dict[SampleKey, float]] = {}
+
+    def register(self, metric: M) -> M:
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "".join(metric.render() for metric in self.metrics)
+
+    def write(self, path: Path) -> None:
+        """Merge metrics into the file atomically, so a scraper (e.g. textfile collector) never reads a partial file.
+
+        Every command run writes the same file: counters and histograms accumulate over the runs, gauges keep
+        the last value per labels, and metrics of other commands are kept.
+        """
+        try:
+            previous = _parse_samples(path.read_text())
+        except OSError:
+            previous = {}
+
+        written = self._written.get(path, {})
+        current: dict[SampleKey, float] = {}
+        text = ""
+
+        for metric in self.metrics:
+            names = metric.sample_names()
+            merged = {key: value for key, value in previous.items() if key[0] in names}
+
+            for name, labels, value in metric.samples():
+                key = (name, tuple(labels))
+                current[key] = value
+                merged[key] = value if isinstance(metric,
+                                                  Gauge) else merged.get(key, 0.0) + value - written.get(key, 0.0)
+
+            text += metric.render((name, labels, value) for (name, labels), value in merged.items())
+
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_text(text)
+        os.replace(tmp_path, path)
+        self._written[path] = current
+
+
+REGISTRY = Registry()
+
+LEDGER_CALLS = REGISTRY.register(
+    Counter("ledger_manager_ledger_calls_total", "Ledger subprocess runs", ["command", "status"]))
+LEDGER_DURATION = REGISTRY.register(
+    Histogram("ledger_manager_ledger_call_duration_seconds", "Ledger subprocess wall time", ["command"]))
+API_REQUESTS = REGISTRY.register(
+    Counter("ledger_manager_api_requests_total", "Exchange rates API requests", ["status"]))
+API_RESPONSE_BYTES = REGISTRY.register(
+    Counter("ledger_manager_api_response_bytes_total", "Exchange rates API response bytes"))
+API_DURATION = REGISTRY.register(
+    Histogram("ledger_manager_api_request_duration_seconds", "Exchange rates API request latency"))
+PRICE_DB_ROWS = REGISTRY.register(
+    Counter("ledger_manager_price_db_rows_appended_total", "Rows appended to the price DB"))
+CACHE_REQUESTS = REGISTRY.register(Counter("ledger_manager_cache_requests_total", "Cache lookups",
+                                           ["cache", "result"]))
+COMMAND_DURATION = REGISTRY.register(
+    Gauge("ledger_manager_command_duration_seconds", "Last command wall time", ["command"]))
+COMMAND_TIMESTAMP = REGISTRY.register(
+    Gauge("ledger_manager_command_timestamp_seconds", "Last command finish time", ["command"]))
+SERVER_REQUESTS = REGISTRY.register(
+    Counter("ledger_manager_server_requests_total", "Server requests", ["use_case", "status"]))
+
+
+def cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.inc(cache=cache, result="hit" if hit else "miss")
@@ -0,0 +1,136 @@
+import json
+import os
+import threading
+import time
+import typing as t
+from pathlib import Path
+
+if t.TYPE_CHECKING:
+    from rich.table import Table
+
+
+class NullSpan:
+    """Span used when profiling is disabled: does nothing."""
+
+    def __enter__(self) -> "NullSpan":
+        return self
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        pass
+
+    def set(self, key: str, value: t.Any) -> None:
+        pass
+
+
+NULL_SPAN = NullSpan()
+
+
+class Span:
+
+    def __init__(self, profiler: "Profiler", name: str, category: str, attrs: dict[str, t.Any]) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.category = category
+        self.attrs = attrs
+        self.start = 0.0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.thread_id = 0
+
+    def __enter__(self) -> "Span":
+        self.thread_id = threading.get_ident()
+        self._cpu_start = time.thread_time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info: t.Any) -> None:
+        self.wall = time.perf_counter() - self.start
+        # Subprocess spans set their own (children) CPU time
+        self.cpu = self.attrs.pop("cpu", time.thread_time() - self._cpu_start)
+        self.profiler.record(self)
+
+    def set(self, key: str, value: t.Any) -> None:
+        self.attrs[key] = value
+
+
+class Profiler:
+    """Collects timing spans of the command phases."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.spans: list[Span] = []
+        self._lock = threading.Lock()
+
+    def span(self, name: str, category: str, **attrs: t.Any) -> Span:
+        return Span(self, name, category, attrs)
+
+    def record(self, span: Span) -> None:
+        with self._lock:
+            self.spans.append(span)
+
+    def summary(self) -> "Table":
+        from rich.table import Table
+
+        total = time.perf_counter() - self.started
+        table = Table(title=f"Profile: {total * 1000:.1f} ms total")
+
+        for column in ("Span", "Calls", "Wall, ms", "CPU, ms", "% wall", "Bytes"):
+            table.add_column(column, justify="left" if column == "Span" else "right")
+
+        groups: dict[str, list[Span]] = {}
+        for span in self.spans:
+            groups.setdefault(span.name, []).append(span)
+
+        for name, spans in sorted(groups.items(), key=lambda g: -sum(s.wall for s in g[1])):
+            wall = sum(s.wall for s in spans)
+            table.add_row(
+                name,
+                str(len(spans)),
+                f"{wall * 1000:.1f}",
+                f"{sum(s.cpu for s in spans) * 1000:.1f}",
+                f"{wall / total * 100:.1f}" if total else "",
+                str(sum(s.attrs.get("bytes", 0) for s in spans) or ""),
+            )
+
+        return table
+
+    def write_trace(self, path: Path) -> None:
+        """Write spans in Chrome trace event format (chrome://tracing, Perfetto)."""
+        events = [{
+            "name": span.name,
+            "cat": span.category,
+            "ph": "X",
+            "ts": (span.start - self.started) * 1e6,
+            "dur": span.wall * 1e6,
+            "pid": os.getpid(),
+            "tid": span.thread_id,
+            "args": {
+                "cpu_ms": span.cpu * 1000,
+                **span.attrs
+            },
+        } for span in self.spans]
+
+        with open(path, "w") as fp:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, fp, default=str)
+
+
+_profiler: t.Optional[Profiler] = None
+
+
+def enable() -> Profiler:
+    global _profiler
+    _profiler = Profiler()
+    return _profiler
+
+
+def disable() -> None:
+    global _profiler
+    _profiler = None
+
+
+def span(name: str, category: str = "", **attrs: t.Any) -> t.Union[Span, NullSpan]:
+    """Timing span of a command phase. Costs a single check when profiling is disabled."""
+    if _profiler is None:
+        return NULL_SPAN
+
+    return _profiler.span(name, category, **attrs)
@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+import socket
+import threading
+import typing as t
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pydantic
+from loguru import logger
+
+from ledger_manager import metrics
+from ledger_manager.api import use_cases
+from ledger_manager.api.config import AppConfig
+from ledger_manager.api.models import BatchResult, ReportSpec
+from ledger_manager.api.services import ExchangeRatesAPIException, LedgerClient, LedgerClientException, PriceDB
+
+# Responses may contain large reports, requests are small
+STREAM_LIMIT = 1 << 20
+
+
+class UseCaseServer:
+    """Serves use cases as newline-delimited JSON over a Unix socket.
+
+    Request is a report spec (see `ReportSpec`) with optional `id`, e.g.
+    `{"id": 1, "use_case": "balance", "patterns": ["^Expenses"], "floor": "month"}`,
+    `{"use_case": "update_price_db"}` or `{"use_case": "metrics"}` (Prometheus text format).
+    Response is a `BatchResult` with the same `id`.
+
+    Config, accounts list, ledger results and parsed price DB are kept warm between requests.
+    Use cases run in a thread pool, so a slow ledger call doesn't block other clients.
+    """
+
+    def __init__(self, config: AppConfig, socket_path: Path, jobs: int = 4) -> None:
+        self.config = config
+        self.socket_path = socket_path
+        self.client = LedgerClient.from_config(config, cache_results=True)
+        self.price_db = PriceDB.from_config(config)
+        self._executor = ThreadPoolExecutor(max_workers=jobs)
+        self._update_lock = threading.Lock()
+
+    def update_price_db(self) -> BatchResult:
+        with self._update_lock:
+            added = use_cases.update_price_db(self.config, price_db=self.price_db)
+
+        if self.config.prewarm_reports:
+            self._executor.submit(use_cases.prewarm_reports, self.config)
+
+        return BatchResult(name="update_price_db", use_case="update_price_db", output=f"Added {added} rows")
+
+    def dispatch(self, request: dict[str, t.Any]) -> BatchResult:
+        use_case = request.get("use_case")
+
+        if use_case == "update_price_db":
+            return self.update_price_db()
+
+        if use_case == "metrics":
+            return BatchResult(name="metrics", use_case="metrics", output=metrics.REGISTRY.render())
+
+        spec = ReportSpec.parse_obj({"name": use_case, **request})
+        return use_cases.run_spec(spec, self.config, self.client)
+
+    def handle_line(self, line: bytes) -> dict[str, t.Any]:
+        request_id = None
+
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Request must be a JSON object")
+
+            request_id = request.pop("id", None)
+            result = self.dispatch(request)
+
+        except (ValueError, pydantic.ValidationError, LedgerClientException, ExchangeRatesAPIException) as exc:
+            result = BatchResult(name="error", use_case="", error=f"{exc.__class__.__qualname__}: {exc}")
+        except Exception as exc:
+            # E.g. missing ledger binary or journal: the client gets the error instead of a dropped connection
+            logger.opt(exception=exc).error("Request failed: {!r}", line)
+            result = BatchResult(name="error", use_case="", error=f"{exc.__class__.__qualname__}: {exc}")
+
+        metrics.SERVER_REQUESTS.inc(use_case=result.use_case, status="error" if result.error else "ok")
+        return {"id": request_id, **result.dict()}
+
+    async def handle_client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        loop = asyncio.get_running_loop()
+
+        try:
+            while line := await reader.readline():
+                if not line.strip():
+                    continue
+
+                response = await loop.run_in_executor(self._executor, self.handle_line, line)
+                writer.write(json.dumps(response).encode() + b"\n")
+                await writer.drain()
+
+        except ValueError as exc:
+            # Request line is longer than the stream limit, the rest of the stream can't be split into requests
+            logger.debug("Client request is too long: {}", exc)
+            result = BatchResult(name="error", use_case="", error=f"Request is longer than {STREAM_LIMIT} bytes")
+            writer.write(json.dumps({"id": None, **result.dict()}).encode() + b"\n")
+
+        except ConnectionError as exc:
+            logger.debug("Client connection error: {}", exc)
+
+        finally:
+            writer.close()
+
+    async def serve_forever(self) -> None:
+        self.socket_path.parent.mkdir(parents=True, exist_ok=True)
+        self.socket_path.unlink(missing_ok=True)
+
+        # Socket is private from its creation, chmod after bind would let other users connect meanwhile
+        umask = os.umask(0o177)
+        try:
+            server = await asyncio.start_unix_server(self.handle_client,
+                                                     path=str(self.socket_path),
+                                                     limit=STREAM_LIMIT)
+        finally:
+            os.umask(umask)
+
+        logger.debug("Listening on {}", self.socket_path)
+
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.socket_path.unlink(missing_ok=True)
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def serve(config: AppConfig, socket_path: Path, jobs: int = 4) -> None:
+    asyncio.run(UseCaseServer(config, socket_path, jobs=jobs).serve_forever())
+
+
+def request(socket_path: Path, payload: dict[str, t.Any]) -> dict[str, t.Any]:
+    """Send a single request to the server and wait for the response."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(str(socket_path))
+        sock.sendall(json.dumps(payload).encode() + b"\n")
+
+        with sock.makefile("rb") as fp:
+            return json.loads(fp.readline())
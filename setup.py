@@ -21,6 +21,6 @@ setup(
     install_requires=parse_requirements("requirements.in"),
     entry_points="""
         [console_scripts]
-        ledger-manager=ledger_manager.cli:app
+        ledger-manager=ledger_manager.__main__:main
     """,
 )
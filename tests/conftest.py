@@ -1,3 +1,8 @@
+import json
+import os
+import sys
+from pathlib import Path
+
 import pytest
 import requests_mock
 
@@ -30,3 +35,61 @@ def apilayer_mock():
     with requests_mock.Mocker() as m:
         m.get('http://test.com/timeseries', json=APILAYER_EXCHANGE_RATES_TIMESERIES)
         yield api_url
+
+
+FAKE_LEDGER = """#!{python}
+import json, os, sys
+
+with open(os.environ["FAKE_LEDGER_LOG"], "a") as fp:
+    fp.write(json.dumps(sys.argv[1:]) + "\\n")
+
+if "accounts" in sys.argv:
+    print(os.environ.get("FAKE_LEDGER_ACCOUNTS", ""))
+else:
+    print(os.environ.get("FAKE_LEDGER_OUTPUT", " ".join(sys.argv[1:])))
+"""
+
+
+class FakeLedger:
+
+    def __init__(self, log_path: Path) -> None:
+        self.log_path = log_path
+
+    @property
+    def calls(self) -> list[list[str]]:
+        if not self.log_path.exists():
+            return []
+
+        return [json.loads(line) for line in self.log_path.read_text().splitlines()]
+
+
+@pytest.fixture
+def fake_ledger(tmp_path: Path, monkeypatch):
+    """`ledger` executable stub that logs its calls."""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    ledger_path = bin_dir / "ledger"
+    ledger_path.write_text(FAKE_LEDGER.format(python=sys.executable))
+    ledger_path.chmod(0o755)
+
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    monkeypatch.setenv("FAKE_LEDGER_LOG", str(tmp_path / "ledger.log"))
+    monkeypatch.setenv("FAKE_LEDGER_ACCOUNTS", "Assets:Cash\nExpenses:Food\nExpenses:Rent")
+
+    yield FakeLedger(tmp_path / "ledger.log")
+
+
+@pytest.fixture
+def app_config(tmp_path: Path):
+    from ledger_manager.api.config import AppConfig
+
+    transactions_path = tmp_path / "transactions.dat"
+    transactions_path.write_text("")
+
+    return AppConfig.parse_obj({
+        "transactions_path": transactions_path,
+        "price_db_settings": {
+            "path": tmp_path / "price.db",
+            "start_date": "2022-12-01",
+        },
+    })
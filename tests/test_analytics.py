@@ -0,0 +1,396 @@
+import datetime
+import json
+import shutil
+import subprocess
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from ledger_manager.api import analytics
+from ledger_manager.api import config as config_module
+from ledger_manager.api.analytics import AccountTree, aggregate, averages, format_amount, period_range
+from ledger_manager.api.models import AggregationType, ExchangeRate, OutputFormat, StandardReport
+from ledger_manager.api.services import PriceDB
+from ledger_manager.api.services.ledger import (
+    BALANCE_FORMAT,
+    REGISTER_FORMAT,
+    AmountStyle,
+    Posting,
+    parse_balance,
+    parse_register,
+)
+from ledger_manager.api.use_cases import STANDARD_REPORTS, average, balance_tree, batch, trend
+
+REGISTER = "\n".join([
+    "2022-01-03\tExpenses:Food\t$\t10",
+    "2022-01-04\tExpenses:Food\t$\t-2.5",
+    "2022-01-11\tExpenses:Rent\t$\t1,000",
+    "2022-02-01\tExpenses:Food\tEUR\t5",
+])
+
+
+def posting(date: str, quantity: str, commodity: str = "$") -> Posting:
+    return Posting(datetime.date.fromisoformat(date), "Expenses", commodity, Decimal(quantity))
+
+
+def test_parse_register():
+    assert list(parse_register(REGISTER))[1:3] == [
+        Posting(datetime.date(2022, 1, 4), "Expenses:Food", "$", Decimal("-2.5")),
+        Posting(datetime.date(2022, 1, 11), "Expenses:Rent", "$", Decimal("1000")),
+    ]
+
+
+@pytest.mark.parametrize(["aggregation", "periods"], [
+    (AggregationType.weekly, ["2021-12-27", "2022-01-03", "2022-01-10"]),
+    (AggregationType.monthly, ["2021-12-01", "2022-01-01"]),
+    (AggregationType.quarterly, ["2021-10-01", "2022-01-01"]),
+    (AggregationType.yearly, ["2021-01-01", "2022-01-01"]),
+])
+def test_period_range(aggregation, periods):
+    result = period_range(datetime.date(2021, 12, 31), datetime.date(2022, 1, 10), aggregation)
+    assert result == [datetime.date.fromisoformat(p) for p in periods]
+
+
+def test_aggregate_averages():
+    postings = [posting("2022-01-03", "10"), posting("2022-01-04", "2"), posting("2022-01-18", "6")]
+    totals = aggregate(postings, [AggregationType.daily, AggregationType.weekly])
+
+    assert totals[AggregationType.weekly] == {
+        "$": {
+            datetime.date(2022, 1, 3): Decimal(12),
+            datetime.date(2022, 1, 17): Decimal(6),
+        }
+    }
+
+    rows = averages(
+        totals[AggregationType.weekly],
+        AggregationType.weekly,
+        begin=datetime.date(2022, 1, 1),
+        end=datetime.date(2022, 2, 1),
+        rolling=2,
+    )
+    assert [(r.total, r.average, r.rolling) for r in rows] == [
+        (Decimal(12), Decimal(12), Decimal(12)),
+        (Decimal(0), Decimal(6), Decimal(6)),
+        (Decimal(6), Decimal(6), Decimal(3)),
+    ]
+
+
+def test_average_single_ledger_call(fake_ledger, app_config, monkeypatch):
+    monkeypatch.setenv("FAKE_LEDGER_OUTPUT", REGISTER)
+
+    output = average(
+        config=app_config,
+        patterns=["^Expenses"],
+        begin=datetime.datetime(2022, 1, 1),
+        end=datetime.datetime(2022, 3, 1),
+        aggregations=[AggregationType.daily, AggregationType.monthly],
+    )
+
+    assert "Daily" in output and "Monthly" in output
+    assert "2022-01-01  $ 1,007.50  $ 1,007.50" in output
+    assert sum("register" in c for c in fake_ledger.calls) == 1
+
+
+def test_average_small_unit_commodity(fake_ledger, app_config, monkeypatch):
+    monkeypatch.setenv(
+        "FAKE_LEDGER_OUTPUT", "\n".join([
+            "2022-01-01\tAssets:Wallet\tBTC\t0.0001",
+            "2022-01-01\tExpenses:Food\t$\t10",
+            "2022-01-03\tAssets:Wallet\tBTC\t0.00002345",
+            "2022-01-03\tExpenses:Food\t$\t0",
+        ]))
+
+    output = average(
+        config=app_config,
+        begin=datetime.datetime(2022, 1, 1),
+        end=datetime.datetime(2022, 1, 4),
+        aggregations=[AggregationType.daily],
+    )
+
+    assert output.splitlines()[-2:] == [
+        "2022-01-03          $ 0.00          $ 3.33",
+        "2022-01-03  BTC 0.00002345  BTC 0.00004115",
+    ]
+
+
+def test_format_amount():
+    assert format_amount("$", Decimal("-1234.5")) == "$ -1,234.50"
+    assert format_amount("$", Decimal("-1234.5"), AmountStyle(prefix=True, separated=False)) == "$-1,234.50"
+    assert format_amount("AAPL", Decimal(7), AmountStyle(prefix=False, thousands=False, precision=0)) == "7 AAPL"
+    assert format_amount("", Decimal("0.5")) == "0.50"
+
+
+def test_trend_matrix(fake_ledger, app_config, monkeypatch):
+    monkeypatch.setenv("FAKE_LEDGER_OUTPUT", REGISTER)
+
+    output = trend(
+        config=app_config,
+        begin=datetime.datetime(2022, 1, 1),
+        end=datetime.datetime(2022, 4, 1),
+        output_format=OutputFormat.csv,
+    )
+
+    assert output.splitlines() == [
+        "account,commodity,2022-01-01,2022-02-01,2022-03-01,total",
+        "Expenses:Food,$,7.5,0,0,7.5",
+        "Expenses:Food,EUR,0,5,0,5",
+        "Expenses:Rent,$,1000,0,0,1000",
+    ]
+    assert len(fake_ledger.calls) == 1
+
+
+def test_trend_multi_commodity_account(fake_ledger, app_config, monkeypatch):
+    monkeypatch.setenv("FAKE_LEDGER_OUTPUT", MULTI_COMMODITY_REGISTER)
+
+    output = trend(
+        config=app_config,
+        begin=datetime.datetime(2022, 1, 1),
+        end=datetime.datetime(2022, 3, 1),
+        depth=1,
+    )
+
+    assert output.splitlines() == [
+        "Account   2022-01-01  2022-02-01        Total",
+        "Assets      $ 930.00      $ 0.00     $ 930.00",
+        "Assets     AAPL 7.00   AAPL 0.00    AAPL 7.00",
+        "Equity   $ -2,000.00      $ 0.00  $ -2,000.00",
+    ]
+    [call] = fake_ledger.calls
+    assert "--depth" not in call and not any(arg.startswith("--monthly") for arg in call)
+
+
+def test_trend_json(fake_ledger, app_config, monkeypatch):
+    monkeypatch.setenv("FAKE_LEDGER_OUTPUT", "2022-01-03\tExpenses:Food\t$\t0.1\n2022-01-04\tExpenses:Food\t$\t0.2")
+
+    output = trend(
+        config=app_config,
+        begin=datetime.datetime(2022, 1, 1),
+        end=datetime.datetime(2022, 3, 1),
+        output_format=OutputFormat.json,
+    )
+
+    assert json.loads(output)["rows"] == [{
+        "account": "Expenses:Food",
+        "commodity": "$",
+        "values": ["0.3", "0"],
+        "total": "0.3",
+    }]
+
+
+BALANCES = {
+    ("Assets:Bank:Checking", "$"): Decimal(100),
+    ("Assets:Budget:Expenses:Food:Cafe", "$"): Decimal(7),
+    ("Assets:Cash", "$"): Decimal(20),
+    ("Assets:Cash", "EUR"): Decimal(5),
+    ("Expenses:Food:Cafe", "$"): Decimal("12.5"),
+    ("Expenses:Food:Groceries", "$"): Decimal(30),
+}
+STYLES = {"$": AmountStyle(separated=False), "EUR": AmountStyle(prefix=False)}
+# `BALANCES` as ledger prints them with `BALANCE_FORMAT`
+BALANCE_OUTPUT = "\n".join([
+    "$100.00\tAssets:Bank:Checking",
+    "$7.00\tAssets:Budget:Expenses:Food:Cafe",
+    "$20.00",
+    "5.00 EUR\tAssets:Cash",
+    "$12.50\tExpenses:Food:Cafe",
+    "$30.00\tExpenses:Food:Groceries",
+])
+
+
+def test_account_tree():
+    tree = AccountTree(BALANCES, STYLES)
+
+    assert tree.totals["Assets"] == {"$": Decimal(127), "EUR": Decimal(5)}
+    assert tree.totals[""] == {"$": Decimal("169.5"), "EUR": Decimal(5)}
+    rows = tree.rows(depth=2)
+    assert [(level, label) for level, label, _ in rows] == [
+        (0, "Assets"),
+        (1, "Bank"),
+        (1, "Budget"),
+        (1, "Cash"),
+        (0, "Expenses:Food"),
+    ]
+    assert rows[-1][2] == {"$": Decimal("42.5")}
+    assert tree.filter("^Assets(?!:Budget).*").render().splitlines() == [
+        "             $120.00",
+        "            5.00 EUR  Assets",
+        "             $100.00    Bank:Checking",
+        "              $20.00",
+        "            5.00 EUR    Cash",
+        "--------------------",
+        "             $120.00",
+        "            5.00 EUR",
+    ]
+    # Total of a single root is shown with its children, like ledger does
+    assert tree.filter("^Expenses").render().splitlines() == [
+        "              $42.50  Expenses:Food",
+        "              $12.50    Cafe",
+        "              $30.00    Groceries",
+        "--------------------",
+        "              $42.50",
+    ]
+    assert tree.filter("^Expenses").render(depth=2).splitlines() == ["              $42.50  Expenses:Food"]
+    assert tree.filter("Cash", "Cafe").depth_balances(1) == {
+        ("Assets", "$"): Decimal(27),
+        ("Assets", "EUR"): Decimal(5),
+        ("Expenses", "$"): Decimal("12.5"),
+    }
+    assert tree.filter("Food").render(depth=1).splitlines() == [
+        "               $7.00  Assets",
+        "              $42.50  Expenses",
+        "--------------------",
+        "              $49.50",
+    ]
+
+
+def test_parse_balance_styles():
+    amounts = list(parse_balance(BALANCE_OUTPUT))
+
+    assert AccountTree(analytics.account_balances(amounts)).balances == BALANCES
+    assert analytics.amount_styles(amounts) == STYLES
+    assert analytics.amount_styles(parse_balance("1000.000 BTC\tAssets:Wallet\n0.5 BTC\tAssets:Cold")) == {
+        "BTC": AmountStyle(prefix=False, thousands=False, precision=3),
+    }
+
+
+# Broker account holds dollars and shares, `MULTI_COMMODITY_REGISTER` is its register with `REGISTER_FORMAT`
+# and `MULTI_COMMODITY_BALANCE` is its flat balance with `BALANCE_FORMAT`
+MULTI_COMMODITY_JOURNAL = """
+2022/01/03 Opening balances
+    Assets:Bank                             $2,000.00
+    Equity:Opening Balances
+
+2022/01/05 Broker deposit
+    Assets:Broker                           $1,500.00
+    Assets:Bank
+
+2022/01/10 Buy AAPL
+    Assets:Broker                           5 AAPL @ $150.00
+    Assets:Broker
+
+2022/01/20 Buy AAPL
+    Assets:Broker                           2 AAPL @ $160.00
+    Assets:Broker
+"""
+
+MULTI_COMMODITY_REGISTER = "\n".join([
+    "2022-01-03\tAssets:Bank\t$\t2,000.00",
+    "2022-01-03\tEquity:Opening Balances\t$\t-2,000.00",
+    "2022-01-05\tAssets:Broker\t$\t1,500.00",
+    "2022-01-05\tAssets:Bank\t$\t-1,500.00",
+    "2022-01-10\tAssets:Broker\tAAPL\t5",
+    "2022-01-10\tAssets:Broker\t$\t-750.00",
+    "2022-01-20\tAssets:Broker\tAAPL\t2",
+    "2022-01-20\tAssets:Broker\t$\t-320.00",
+])
+
+MULTI_COMMODITY_BALANCE = "\n".join([
+    "$500.00\tAssets:Bank",
+    "$430.00",
+    "7 AAPL\tAssets:Broker",
+    "$-2,000.00\tEquity:Opening Balances",
+])
+
+AAPL_RATE = ExchangeRate(date=datetime.datetime(2022, 1, 25), symbol="AAPL", price=170, price_symbol="$")
+
+
+@pytest.mark.skipif(shutil.which("ledger") is None, reason="ledger isn't installed")
+def test_multi_commodity_register_fixture(tmp_path: Path):
+    journal_path = tmp_path / "journal.ledger"
+    journal_path.write_text(MULTI_COMMODITY_JOURNAL)
+
+    output = subprocess.run(
+        ["ledger", "-f", str(journal_path), "register", "--format", REGISTER_FORMAT],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    assert list(parse_register(output)) == list(parse_register(MULTI_COMMODITY_REGISTER))
+
+
+@pytest.mark.skipif(shutil.which("ledger") is None, reason="ledger isn't installed")
+def test_multi_commodity_balance_fixture(tmp_path: Path):
+    journal_path = tmp_path / "journal.ledger"
+    journal_path.write_text(MULTI_COMMODITY_JOURNAL)
+
+    output = subprocess.run(
+        ["ledger", "-f", str(journal_path), "balance", "--flat", "--empty", "--format", BALANCE_FORMAT],
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+
+    assert list(parse_balance(output)) == list(parse_balance(MULTI_COMMODITY_BALANCE))
+
+
+def test_balance_tree_multi_commodity_account(fake_ledger, app_config, monkeypatch):
+    monkeypatch.setenv("FAKE_LEDGER_OUTPUT", MULTI_COMMODITY_BALANCE)
+
+    output = balance_tree(config=app_config, patterns=["^Assets"])
+
+    assert output.splitlines() == [
+        "             $930.00",
+        "              7 AAPL  Assets",
+        "             $500.00    Bank",
+        "             $430.00",
+        "              7 AAPL    Broker",
+        "--------------------",
+        "             $930.00",
+        "              7 AAPL",
+    ]
+    [call] = fake_ledger.calls
+    assert {"balance", "--flat", "--empty"} <= set(call)
+
+
+def test_balance_tree_exchange(tmp_path: Path, fake_ledger, app_config, monkeypatch):
+    monkeypatch.setattr(config_module, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setenv("FAKE_LEDGER_OUTPUT", MULTI_COMMODITY_BALANCE)
+    PriceDB.from_config(app_config).append_rows([AAPL_RATE])
+
+    output = balance_tree(config=app_config, patterns=["^Assets"], end=datetime.datetime(2022, 2, 1), exchange="$")
+
+    # Shares are valued at the rate of the report end, not at their purchase prices
+    assert output.splitlines() == [
+        "           $2,120.00  Assets",
+        "             $500.00    Bank",
+        "           $1,620.00    Broker",
+        "--------------------",
+        "           $2,120.00",
+    ]
+    # Native balances are shared with the reports without exchange
+    [call] = fake_ledger.calls
+    assert "--exchange" not in call and "-X" not in call
+
+
+@pytest.mark.skipif(shutil.which("ledger") is None, reason="ledger isn't installed")
+@pytest.mark.parametrize("exchange", [None, "$"])
+def test_balance_tree_matches_ledger(tmp_path: Path, app_config, monkeypatch, exchange):
+    monkeypatch.setattr(config_module, "CACHE_DIR", tmp_path / "cache")
+    app_config.transactions_path.write_text(MULTI_COMMODITY_JOURNAL)
+    price_db = PriceDB.from_config(app_config)
+    price_db.append_rows([AAPL_RATE])
+
+    output = balance_tree(config=app_config,
+                          patterns=["^Assets"],
+                          end=datetime.datetime(2022, 2, 1),
+                          exchange=exchange)
+
+    cmd = ["ledger", "-f", str(app_config.transactions_path), "--price-db", str(price_db.db_path), "balance"]
+    cmd += ["--end", "2022-02-01", *(["--exchange", exchange] if exchange else []), "^Assets"]
+    ledger_output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+    assert output.splitlines() == ledger_output.splitlines()
+
+
+def test_standard_reports_single_ledger_call(fake_ledger, app_config, monkeypatch):
+    monkeypatch.setenv("FAKE_LEDGER_OUTPUT", BALANCE_OUTPUT)
+    specs = [STANDARD_REPORTS[StandardReport.budget], STANDARD_REPORTS[StandardReport.expenses]]
+
+    budget, expenses = batch(specs, app_config)
+
+    assert budget.output.splitlines() == ["               $7.00  Assets:Budget:Expenses:Food"]
+    assert expenses.output.splitlines()[0] == "              $42.50  Expenses:Food"
+    assert len(fake_ledger.calls) == 1
+    assert "--depth" not in fake_ledger.calls[0]
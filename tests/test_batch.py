@@ -0,0 +1,129 @@
+from pathlib import Path
+
+import arrow
+import pytest
+import requests
+import typer
+
+from ledger_manager.api import use_cases
+from ledger_manager.api.config import AppConfig
+from ledger_manager.api.models import ReportSpec
+from ledger_manager.api.use_cases import batch, multi_journal
+from ledger_manager.cli.common import journal_outputs
+
+
+def test_batch(tmp_path: Path, fake_ledger, app_config):
+    specs_path = tmp_path / "specs.yaml"
+    specs_path.write_text("""
+specs:
+  - use_case: balance
+    patterns: ["^Expenses"]
+    begin: 2022-01-01
+    end: 2022-02-01
+  - name: same-balance
+    use_case: balance
+    patterns: ["^Expenses"]
+    begin: 2022-01-01
+    end: 2022-02-01
+  - use_case: forward
+    args: [register]
+    patterns: ["Cash"]
+""")
+    specs = ReportSpec.from_file(specs_path)
+    results = list(batch(specs, config=app_config, jobs=3))
+
+    assert [r.name for r in results] == ["0-balance", "same-balance", "2-forward"]
+    assert results[0].output == results[1].output
+    assert "Expenses:Food" in results[0].output and "Expenses:Rent" in results[0].output
+    assert results[2].output.strip().endswith("register Assets:Cash")
+
+    calls = fake_ledger.calls
+    assert sum("accounts" in c for c in calls) == 1
+    assert sum("balance" in c for c in calls) == 1
+
+
+def test_report_spec_forward_options():
+    with pytest.raises(ValueError):
+        ReportSpec(name="forward", use_case="forward", exchange="USD")
+
+
+def test_multi_journal(tmp_path: Path, fake_ledger, app_config):
+    # Price DB is up to date, so its update doesn't call the API
+    app_config.price_db_settings.path.write_text(f"P 2022/12/01 00:00:00 $ 60.0 RUB\n"
+                                                 f"P {arrow.utcnow().datetime:%Y/%m/%d} 00:00:00 $ 60.0 RUB\n")
+    configs: dict[str, AppConfig] = {}
+
+    for name in ("b", "a", "c"):
+        transactions_path = tmp_path / f"{name}.dat"
+        transactions_path.write_text("")
+        configs[f"{name}.yaml"] = app_config.copy(update={"transactions_path": transactions_path})
+
+    specs = [
+        ReportSpec(name="balance", use_case="balance", patterns=["^Expenses"]),
+        ReportSpec(name="register", use_case="forward", args=["register"]),
+    ]
+    results = list(multi_journal(configs, specs, update_db=True, jobs=2))
+
+    assert [(r.journal, r.name) for r in results] == [
+        ("b.yaml", "update_price_db"),
+        *((journal, spec) for journal in ("b.yaml", "a.yaml", "c.yaml") for spec in ("balance", "register")),
+    ]
+    assert results[0].output.startswith("Added 0 rows")
+    assert all(f"{r.journal[0]}.dat" in r.output for r in results[1:])
+
+
+@pytest.mark.parametrize("exc, error", [
+    (requests.ConnectionError("api.apilayer.com"), "ConnectionError: api.apilayer.com"),
+    (PermissionError("price.db"), "PermissionError: price.db"),
+])
+def test_multi_journal_price_db_error(tmp_path: Path, app_config, monkeypatch, exc, error):
+
+    def update_price_db(config):
+        if config.price_db_settings.path == app_config.price_db_settings.path:
+            raise exc
+
+        return 0
+
+    monkeypatch.setattr(use_cases, "update_price_db", update_price_db)
+    other_config = app_config.copy(
+        update={"price_db_settings": app_config.price_db_settings.copy(update={"path": tmp_path / "other.db"})})
+
+    failed, other = multi_journal({"a.yaml": app_config, "b.yaml": other_config}, [], update_db=True, jobs=1)
+
+    assert (failed.journal, failed.name, failed.error) == ("a.yaml", "update_price_db", error)
+    assert (other.journal, other.error) == ("b.yaml", None)
+
+
+def test_journal_outputs(tmp_path: Path):
+    specs = [
+        ReportSpec(name="balance", use_case="balance", output="balance.txt"),
+        ReportSpec(name="register", use_case="forward", args=["register"]),
+    ]
+
+    outputs = journal_outputs([tmp_path / "a.yaml", tmp_path / "b.yaml"], specs)
+
+    assert outputs == {
+        (str(tmp_path / "a.yaml"), "balance"): tmp_path / "a" / "balance.txt",
+        (str(tmp_path / "b.yaml"), "balance"): tmp_path / "b" / "balance.txt",
+    }
+
+    specs[0].output = tmp_path / "balance.txt"
+    with pytest.raises(typer.BadParameter, match="balance.txt"):
+        journal_outputs([tmp_path / "a.yaml", tmp_path / "b.yaml"], specs)
+
+
+def test_batch_spec_error(fake_ledger, app_config, monkeypatch):
+
+    def average(*args, **kwargs):
+        raise FileNotFoundError("journal.dat")
+
+    monkeypatch.setitem(use_cases.REPORT_USE_CASES, "average", average)
+    specs = [
+        ReportSpec(name="average", use_case="average"),
+        ReportSpec(name="register", use_case="forward", args=["register"]),
+    ]
+
+    failed, result = batch(specs, config=app_config)
+
+    assert failed.error == "FileNotFoundError: journal.dat"
+    assert result.error is None and result.output
@@ -0,0 +1,30 @@
+import datetime
+from pathlib import Path
+
+from benchmarks import generators
+from benchmarks.run import run_suite
+from ledger_manager.api.services import PriceDB
+
+
+def test_generators(tmp_path: Path):
+    accounts = generators.write_journal(tmp_path / "journal.ledger", postings=100, accounts=20, depth=4)
+    assert len(accounts) == 20
+    assert all(2 <= len(account.split(":")) <= 4 for account in accounts)
+    assert (tmp_path / "journal.ledger").read_text().count("\n\n") == 50
+
+    rows = generators.write_price_db(
+        tmp_path / "price.db",
+        datetime.date(2022, 1, 1),
+        datetime.date(2022, 1, 10),
+        ["EUR", "RUB"],
+    )
+    records = PriceDB(tmp_path / "price.db").read_db()
+    assert rows == len(records) == 20
+    assert records == generators.price_records(datetime.date(2022, 1, 1), datetime.date(2022, 1, 10), ["EUR", "RUB"])
+
+
+def test_run_suite(tmp_path: Path):
+    results = run_suite(tmp_path, postings=100, accounts=20, depth=4, years=1, symbols=2, repeat=1)
+
+    assert {"pricedb.read_db", "ledger_cmd.search_accounts", "use_cases.update_price_db"} <= set(results)
+    assert all(stats["runs"] == 1 and stats["min"] > 0 for stats in results.values())
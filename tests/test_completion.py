@@ -0,0 +1,122 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import click
+import pytest
+
+from ledger_manager import completion
+
+# Completion budget for the fast path, seconds. Override for slow machines.
+COMPLETION_BUDGET = float(os.environ.get("LEDGER_MANAGER_COMPLETION_BUDGET", "0.5"))
+
+HEAVY_MODULES = ["click", "typer", "rich", "loguru", "pydantic", "requests", "ledger_manager.cli"]
+
+ACCOUNTS = ["Assets:Cash", "Assets:Bank:Checking", "Expenses:Food:Groceries", "Expenses:Food:Cafe", "Expenses:Rent"]
+
+COMPLETION_BENCHMARK = """
+import json, sys, time
+start = time.perf_counter()
+from ledger_manager.__main__ import main
+main()
+elapsed = time.perf_counter() - start
+sys.stderr.write(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+def test_complete_accounts():
+    assert completion.complete_accounts(ACCOUNTS, "") == ["Assets", "Expenses"]
+    assert completion.complete_accounts(ACCOUNTS, "Exp") == ["Expenses"]
+    assert completion.complete_accounts(ACCOUNTS, "Expenses:") == ["Expenses:Food", "Expenses:Rent"]
+    assert completion.complete_accounts(ACCOUNTS, "^Expenses:Food:") == [
+        "^Expenses:Food:Cafe",
+        "^Expenses:Food:Groceries",
+    ]
+
+
+def test_parse_request():
+    bash = {
+        "_LEDGER_MANAGER_COMPLETE": "complete_bash",
+        "COMP_WORDS": "lm reports balance Expenses : Fo",
+        "COMP_CWORD": "5"
+    }
+    assert completion.parse_request(bash) == ("bash", ["reports", "balance"], "Expenses:Fo")
+
+    zsh = {"_LEDGER_MANAGER_COMPLETE": "complete_zsh", "_TYPER_COMPLETE_ARGS": "lm -f my.yaml forward -f Exp"}
+    assert completion.parse_request(zsh) == ("zsh", ["-f", "my.yaml", "forward", "-f"], "Exp")
+
+    assert completion.parse_request({}) is None
+
+
+@pytest.mark.parametrize("args, incomplete, expected", [
+    (["reports", "balance"], "Exp", True),
+    (["reports", "balance", "--exchange"], "", False),
+    (["reports", "balance", "--watch"], "Exp", True),
+    (["reports", "balance"], "--wa", False),
+    (["reports", "assets"], "", False),
+    (["-f", "my.yaml", "forward", "-f"], "Exp", True),
+    (["forward"], "Exp", False),
+])
+def test_is_pattern_position(args, incomplete, expected):
+    assert completion.is_pattern_position(args, incomplete)[0] is expected
+
+
+def test_is_pattern_position_config_file():
+    assert completion.is_pattern_position(["--config-file=my.yaml", "reports", "balance"], "")[1] == Path("my.yaml")
+
+
+def test_app_dir():
+    assert completion.app_dir() == Path(click.get_app_dir("ledger-manager"))
+
+
+def test_account_index_config_changed(tmp_path: Path, monkeypatch):
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "config"))
+    monkeypatch.delenv("TRANSACTIONS_PATH", raising=False)
+    journal_path = tmp_path / "journal.ledger"
+    journal_path.write_text("")
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("transactions_path: journal.ledger\n")
+
+    index = completion.AccountIndex.build(config_file, ["transactions_path"], journal_path, ACCOUNTS)
+    assert index.is_fresh()
+
+    monkeypatch.setenv("TRANSACTIONS_PATH", "other.ledger")
+    assert index.config_changed() and not index.is_fresh()
+    monkeypatch.delenv("TRANSACTIONS_PATH")
+
+    app_config_path = tmp_path / "config" / "ledger-manager" / "config.yaml"
+    app_config_path.parent.mkdir(parents=True)
+    app_config_path.write_text("transactions_path: other.ledger\n")
+    assert index.config_changed()
+    app_config_path.unlink()
+    assert index.is_fresh()
+
+    config_file.write_text("transactions_path: other.ledger\n")
+    assert index.config_changed()
+
+
+def test_fast_completion(tmp_path: Path, monkeypatch):
+    journal_path = tmp_path / "journal.ledger"
+    journal_path.write_text("")
+    config_file = tmp_path / "config.yaml"
+
+    monkeypatch.setenv("XDG_CONFIG_HOME", str(tmp_path / "config"))
+    monkeypatch.setenv("HOME", str(tmp_path))
+    env = {**os.environ}
+    env.update({
+        "_LEDGER_MANAGER_COMPLETE": "complete_zsh",
+        "_TYPER_COMPLETE_ARGS": f"ledger-manager -f {config_file} reports balance Expenses:",
+    })
+
+    completion_path = completion.index_path(config_file).relative_to(completion.app_dir())
+    index_path = tmp_path / "config" / "ledger-manager" / completion_path
+    completion.AccountIndex.build(config_file, ["transactions_path"], journal_path, ACCOUNTS).save(index_path)
+
+    result = subprocess.run([sys.executable, "-c", COMPLETION_BENCHMARK], env=env, capture_output=True, text=True)
+    stats = json.loads(result.stderr)
+
+    assert result.stdout == "_arguments '*: :((\"Expenses:Food\"\n\"Expenses:Rent\"))'"
+    assert not set(HEAVY_MODULES) & set(stats["modules"])
+    assert stats["elapsed"] < COMPLETION_BUDGET
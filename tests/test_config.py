@@ -0,0 +1,58 @@
+import os
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from ledger_manager.api import config as config_module
+from ledger_manager.api.config import AppConfig, load_config
+
+
+@pytest.fixture
+def config_file(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(config_module, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setattr(config_module, "APP_CONFIG_PATH", tmp_path / "app_config.yaml")
+    monkeypatch.chdir(tmp_path)
+    load_config.cache_clear()
+
+    (tmp_path / "transactions.dat").write_text("")
+    path = tmp_path / "config.yaml"
+    path.write_text("transactions_path: ./transactions.dat\n")
+
+    yield path
+    load_config.cache_clear()
+
+
+def test_load_config_snapshot(config_file: Path):
+    config = load_config(config_file)
+    assert config.transactions_path == config_file.parent / "transactions.dat"
+    assert load_config(config_file) is config
+
+    load_config.cache_clear()
+    with patch.object(AppConfig, "from_file", side_effect=AssertionError("Snapshot is not used")):
+        assert load_config(config_file) == config
+
+
+def test_load_config_snapshot_invalidation(config_file: Path):
+    load_config(config_file)
+    load_config.cache_clear()
+
+    (config_file.parent / "other.dat").write_text("")
+    config_file.write_text("transactions_path: ./other.dat\n")
+    os.utime(config_file, ns=(0, 0))
+
+    assert load_config(config_file).transactions_path == config_file.parent / "other.dat"
+
+
+def test_load_config_snapshot_schema(config_file: Path, monkeypatch):
+    load_config(config_file)
+    load_config.cache_clear()
+    [snapshot_path] = (config_file.parent / "cache").iterdir()
+    assert snapshot_path.stat().st_mode & 0o777 == 0o600
+
+    # Snapshot of another config model (e.g. before a field was added) is not used
+    monkeypatch.setattr(AppConfig, "schema_json", classmethod(lambda cls: "{}"))
+    with patch.object(AppConfig, "from_file", wraps=AppConfig.from_file) as from_file:
+        load_config(config_file)
+
+    from_file.assert_called_once()
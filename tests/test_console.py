@@ -0,0 +1,45 @@
+import io
+
+from rich.console import Console
+from rich.text import Text
+
+from ledger_manager import console as console_module
+from ledger_manager.console import CustomHighlighter, print_output
+
+
+def test_highlighter():
+    text = Text("2022/12/01 Shop  Expenses:Food:MIR  -10.50 EUR  <Total>")
+    CustomHighlighter().highlight(text)
+
+    assert [(text.plain[s.start:s.end], s.style) for s in text.spans] == [
+        ("2022/12/01", "custom.date"),
+        ("Shop", "custom.account"),
+        ("Expenses:Food", "custom.account"),
+        (":MIR", "custom.account"),
+        ("-10.50", "custom.price"),
+        ("EUR", "custom.commodity"),
+        ("<Total>", "custom.unimportant"),
+    ]
+
+
+def test_print_output_plain(monkeypatch):
+    output = io.StringIO()
+    monkeypatch.setattr(console_module, "console", Console(file=output, force_terminal=False))
+
+    print_output("[Assets:Budget]  $ 10")
+    assert output.getvalue() == "[Assets:Budget]  $ 10\n"
+
+
+def test_print_output_highlighted(monkeypatch):
+    output = io.StringIO()
+    console = Console(file=output, force_terminal=True, highlighter=CustomHighlighter(), theme=console_module.theme)
+    monkeypatch.setattr(console_module, "console", console)
+
+    print_output("[Assets:Budget]  $ 10\n" * 1000)
+    assert "\x1b[" in output.getvalue()
+    assert Text.from_ansi(output.getvalue()).plain.split("\n") == ["[Assets:Budget]  $ 10"] * 1000
+
+    output.truncate(0)
+    output.seek(0)
+    print_output("[Assets:Budget]  $ 10\n", size_limit=10)
+    assert output.getvalue() == "[Assets:Budget]  $ 10\n"
@@ -0,0 +1,78 @@
+import sqlite3
+from pathlib import Path
+
+from ledger_manager.api.services import LedgerClient, SQLiteExport
+
+
+def register_output(*transactions: tuple[int, str, str]) -> str:
+    lines = []
+    for line, payee, amount in transactions:
+        lines.append(f"main.ledger\t{line}\t2022-12-01\t\t{payee}\t2022-12-01\tExpenses:Food:Cafe\t$\t{amount}")
+        lines.append(f"main.ledger\t{line}\t2022-12-01\t\t{payee}\t2022-12-01\tAssets:Cash\t$\t-{amount}")
+
+    return "\n".join(lines)
+
+
+def test_export_sqlite(tmp_path: Path, fake_ledger, monkeypatch):
+    journal_path = tmp_path / "main.ledger"
+    db_path = tmp_path / "export.sqlite"
+    export = SQLiteExport(db_path, LedgerClient(journal_path, tmp_path / "price.db"))
+
+    journal_path.write_text("v1")
+    monkeypatch.setenv("FAKE_LEDGER_OUTPUT",
+                       register_output((1, "Cafe", "10.50"), (4, "Cafe", "10.50"), (7, "Shop", "1,000")))
+    assert tuple(export.export()) == (3, 0, 0)
+
+    # Journal is unchanged: ledger isn't called
+    calls = len(fake_ledger.calls)
+    assert tuple(export.export()) == (0, 0, 3)
+    assert len(fake_ledger.calls) == calls
+
+    # Transaction inserted on top, "Shop" is changed
+    journal_path.write_text("v2")
+    monkeypatch.setenv(
+        "FAKE_LEDGER_OUTPUT",
+        register_output((1, "Bar", "5"), (4, "Cafe", "10.50"), (7, "Cafe", "10.50"), (10, "Shop", "999")))
+    assert tuple(export.export()) == (2, 1, 2)
+
+    with sqlite3.connect(db_path) as connection:
+        assert connection.execute("SELECT payee, line FROM transactions ORDER BY line").fetchall() == [
+            ("Bar", 1),
+            ("Cafe", 4),
+            ("Cafe", 7),
+            ("Shop", 10),
+        ]
+        assert connection.execute("SELECT account_root, account_parent, account_depth, commodity, sum(amount)"
+                                  " FROM postings GROUP BY account").fetchall() == [
+                                      ("Assets", "Assets", 2, "$", -1025.0),
+                                      ("Expenses", "Expenses:Food", 3, "$", 1025.0),
+                                  ]
+        assert connection.execute("SELECT name, parent, depth FROM accounts ORDER BY name").fetchall() == [
+            ("Assets", None, 1),
+            ("Assets:Cash", "Assets", 2),
+            ("Expenses", None, 1),
+            ("Expenses:Food", "Expenses", 2),
+            ("Expenses:Food:Cafe", "Expenses:Food", 3),
+        ]
+
+
+def test_export_sqlite_columns(tmp_path: Path, fake_ledger, monkeypatch):
+    journal_path = tmp_path / "main.ledger"
+    db_path = tmp_path / "export.sqlite"
+    export = SQLiteExport(db_path, LedgerClient(journal_path, tmp_path / "price.db"))
+
+    # Export of the previous schema version is recreated
+    with sqlite3.connect(db_path) as connection:
+        connection.execute("CREATE TABLE postings (id INTEGER PRIMARY KEY, quantity REAL, amount TEXT)")
+    connection.close()
+
+    journal_path.write_text("v1")
+    monkeypatch.setenv("FAKE_LEDGER_OUTPUT", register_output((1, "Shop", "1,000")))
+    assert tuple(export.export()) == (1, 0, 0)
+
+    with sqlite3.connect(db_path) as connection:
+        assert connection.execute("SELECT account, amount, quantity FROM postings ORDER BY id").fetchall() == [
+            ("Expenses:Food:Cafe", 1000.0, "1,000"),
+            ("Assets:Cash", -1000.0, "-1,000"),
+        ]
+    connection.close()
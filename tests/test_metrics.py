@@ -0,0 +1,108 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from ledger_manager import metrics
+from ledger_manager.api.services import LedgerClient
+
+
+def test_render():
+    counter = metrics.Counter("test_total", "Test counter", ["kind"])
+    counter.inc(kind="a")
+    counter.inc(2, kind="b\"")
+
+    histogram = metrics.Histogram("test_seconds", "Test histogram", buckets=[0.1, 1])
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert counter.render() == ('# HELP test_total Test counter\n'
+                                '# TYPE test_total counter\n'
+                                'test_total{kind="a"} 1\n'
+                                'test_total{kind="b\\""} 2\n')
+    assert histogram.render().splitlines()[2:] == [
+        'test_seconds_bucket{le="0.1"} 1',
+        'test_seconds_bucket{le="1"} 2',
+        'test_seconds_bucket{le="+Inf"} 3',
+        'test_seconds_sum 5.55',
+        'test_seconds_count 3',
+    ]
+
+
+def test_registry_write(tmp_path: Path):
+    path = tmp_path / "metrics.prom"
+    path.write_text('# TYPE test_total counter\ntest_total{kind="other"} 5\ntest_total{kind="a"} 10\n')
+    registry = metrics.Registry()
+    counter = registry.register(metrics.Counter("test_total", "Test counter", ["kind"]))
+    gauge = registry.register(metrics.Gauge("test_seconds", "Test gauge"))
+
+    counter.inc(kind="a")
+    gauge.set(3)
+    registry.write(path)
+    # Values already written by this process aren't added again
+    counter.inc(kind="a")
+    gauge.set(1)
+    registry.write(path)
+
+    assert path.read_text().splitlines()[2:] == [
+        'test_total{kind="other"} 5',
+        'test_total{kind="a"} 12',
+        '# HELP test_seconds Test gauge',
+        '# TYPE test_seconds gauge',
+        'test_seconds 1',
+    ]
+
+
+def test_ledger_metrics(tmp_path: Path, fake_ledger):
+    client = LedgerClient(tmp_path / "main.ledger", tmp_path / "price.db", cache_results=True)
+    calls = metrics.LEDGER_CALLS.value(command="balance", status="ok")
+    hits = metrics.CACHE_REQUESTS.value(cache="ledger_results", result="hit")
+
+    for _ in range(3):
+        client.call(["ledger", "-f", "main.ledger", "balance"])
+
+    assert metrics.LEDGER_CALLS.value(command="balance", status="ok") == calls + 1
+    assert metrics.CACHE_REQUESTS.value(cache="ledger_results", result="hit") == hits + 2
+    assert metrics.LEDGER_DURATION.count(command="balance") >= 1
+
+
+def test_metrics_file(tmp_path: Path, fake_ledger, app_config, monkeypatch):
+    from ledger_manager.cli import app
+    from ledger_manager.cli.common import CommonParams
+
+    monkeypatch.setattr(CommonParams, "config", app_config)
+    metrics_path = tmp_path / "ledger_manager.prom"
+
+    result = CliRunner().invoke(app, ["--metrics-file", str(metrics_path), "reports", "balance"])
+    assert result.exit_code == 0, result.output
+
+    text = metrics_path.read_text()
+    assert 'ledger_manager_ledger_calls_total{command="balance",status="ok"}' in text
+    assert 'ledger_manager_command_duration_seconds{command="reports balance"}' in text
+
+
+def test_metrics_file_merge(tmp_path: Path, fake_ledger, app_config):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text(f"transactions_path: {app_config.transactions_path}\n"
+                           f"price_db_settings:\n  path: {app_config.price_db_settings.path}\n")
+    metrics_path = tmp_path / "ledger_manager.prom"
+    env = {**os.environ, "XDG_CONFIG_HOME": str(tmp_path / "config")}
+
+    def run(*args: str) -> dict:
+        cmd = [sys.executable, "-m", "ledger_manager", "-f", str(config_file), "--metrics-file", str(metrics_path)]
+        subprocess.run([*cmd, *args], env=env, check=True, capture_output=True)
+        return metrics._parse_samples(metrics_path.read_text())
+
+    balance = ("ledger_manager_ledger_calls_total", (("command", "balance"), ("status", "ok")))
+    balance_duration = ("ledger_manager_command_duration_seconds", (("command", "reports balance"), ))
+
+    first = run("reports", "balance")
+    second = run("reports", "balance")
+    third = run("forward", "register")
+
+    assert (first[balance], second[balance], third[balance]) == (1, 2, 2)
+    assert balance_duration in third
+    assert ("ledger_manager_command_duration_seconds", (("command", "forward"), )) in third
@@ -0,0 +1,65 @@
+from pathlib import Path
+
+from typer.testing import CliRunner
+
+from ledger_manager.api import use_cases
+from ledger_manager.api.constants import StandardReport
+from ledger_manager.api.services import LedgerClient, ResultStore
+from ledger_manager.api.services import results as results_module
+from ledger_manager.cli import app
+
+BALANCE = "$100.00\tAssets:Cash\n$10.00\tExpenses:Food"
+
+
+def test_result_store(tmp_path: Path):
+    store = ResultStore(tmp_path)
+    cmd = ["ledger", "balance"]
+
+    assert store.get(cmd, "a") is None
+    store.put(cmd, "a", "output")
+    store.put(["ledger", "register"], "a", "register output")
+    assert store.get(cmd, "a") == "output"
+
+    # Outputs of the new fingerprint replace the stale ones
+    store.put(cmd, "b", "new output")
+    assert store.get(cmd, "a") is None
+    assert store.get(cmd, "b") == "new output"
+    assert [path.name for path in tmp_path.iterdir()] == ["b"]
+
+    store.prune("c")
+    assert store.get(cmd, "b") is None
+
+
+def test_prewarm_reports(tmp_path: Path, monkeypatch, fake_ledger, app_config):
+    monkeypatch.setattr(results_module, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setenv("FAKE_LEDGER_OUTPUT", BALANCE)
+    app_config.prewarm_reports = [StandardReport.assets, StandardReport.budget]
+
+    results = use_cases.prewarm_reports(app_config)
+    assert [r.name for r in results] == ["assets", "budget"]
+    assert len(fake_ledger.calls) == 2
+
+    # Interactive run in another process gets the stored result
+    client = LedgerClient.from_config(app_config, result_store=ResultStore.from_config(app_config))
+    spec = use_cases.STANDARD_REPORTS[StandardReport.assets]
+    output = use_cases.balance_tree(config=app_config, client=client, patterns=spec.patterns)
+
+    assert output == results[0].output == "             $100.00  Assets:Cash\n"
+    assert len(fake_ledger.calls) == 2
+
+    app_config.transactions_path.write_text("; changed\n")
+    use_cases.balance_tree(config=app_config, client=client, patterns=spec.patterns)
+    assert len(fake_ledger.calls) == 3
+
+
+def test_reports_use_stored_results(tmp_path: Path, monkeypatch, fake_ledger, app_config):
+    monkeypatch.setattr(results_module, "CACHE_DIR", tmp_path / "cache")
+    monkeypatch.setenv("FAKE_LEDGER_OUTPUT", BALANCE)
+    monkeypatch.setattr("ledger_manager.cli.common.CommonParams.config", app_config)
+
+    [result] = use_cases.prewarm_reports(app_config, [StandardReport.expenses])
+    cli_result = CliRunner().invoke(app, ["reports", "expenses"])
+
+    assert cli_result.exit_code == 0, cli_result.output
+    assert "Expenses:Food" in cli_result.output
+    assert len(fake_ledger.calls) == 1
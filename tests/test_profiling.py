@@ -0,0 +1,37 @@
+import json
+from pathlib import Path
+
+from rich.console import Console
+
+from ledger_manager import profiling
+from ledger_manager.api.services import LedgerClient
+
+
+def test_span_disabled():
+    assert profiling.span("ledger", "subprocess") is profiling.NULL_SPAN
+
+
+def test_profile_ledger_call(tmp_path: Path, fake_ledger):
+    client = LedgerClient(tmp_path / "main.ledger", tmp_path / "price.db")
+    profiler = profiling.enable()
+    try:
+        with profiling.span("use case"):
+            client.call(["ledger", "-f", "main.ledger", "balance"])
+    finally:
+        profiling.disable()
+
+    assert [s.name for s in profiler.spans] == ["ledger balance", "use case"]
+    assert profiler.spans[0].attrs["bytes"] > 0
+    assert profiler.spans[1].wall >= profiler.spans[0].wall
+
+    console = Console(record=True, width=120)
+    console.print(profiler.summary())
+    summary = console.export_text()
+    assert 0 <= summary.index("use case") < summary.index("ledger balance")
+
+    profiler.write_trace(tmp_path / "trace.json")
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    assert [(e["name"], e["cat"], e["ph"]) for e in events] == [
+        ("ledger balance", "subprocess", "X"),
+        ("use case", "", "X"),
+    ]
@@ -0,0 +1,142 @@
+import datetime
+from decimal import Decimal
+from pathlib import Path
+
+import arrow
+import pytest
+
+from ledger_manager.api import config as config_module
+from ledger_manager.api.models import ExchangeRate
+from ledger_manager.api.services import PriceDB
+from ledger_manager.api.services.ledger import AccountAmount, AmountStyle, parse_balance
+from ledger_manager.api.services.pricedb import RateMatrix
+from ledger_manager.api.use_cases import balance, balance_tree
+
+
+def rate(date: str, symbol: str, price: float, price_symbol: str) -> ExchangeRate:
+    return ExchangeRate(date=arrow.get(date).datetime, symbol=symbol, price=price, price_symbol=price_symbol)
+
+
+RATES = [
+    rate("2022-12-01", "$", 60, "₽"),
+    rate("2022-12-01", "$", 0.9, "EUR"),
+    rate("2022-12-03", "$", 62, "₽"),
+    rate("2022-12-02", "AAPL", 150, "$"),
+]
+
+
+def test_rate_matrix():
+    matrix = RateMatrix.from_records(RATES)
+
+    assert matrix.base == "$"
+    assert matrix.rate("₽", datetime.date(2022, 11, 30)) is None
+    assert matrix.rate("₽", datetime.date(2022, 12, 2)) == 60
+    assert matrix.rate("₽", datetime.date(2023, 1, 1)) == 62
+    assert matrix.rate("AAPL", datetime.date(2022, 12, 1)) is None
+    assert float(matrix.convert(Decimal(2), "AAPL", "₽", datetime.date(2022, 12, 3))) == pytest.approx(300 * 62)
+    assert matrix.convert(Decimal(90), "EUR", "$", datetime.date(2022, 12, 3)) == Decimal(100)
+
+
+def test_rate_matrix_cache(tmp_path: Path, monkeypatch):
+    monkeypatch.setattr(config_module, "CACHE_DIR", tmp_path / "cache")
+    db = PriceDB(tmp_path / "price.db")
+    db.append_rows(RATES)
+
+    matrix = db.rate_matrix()
+    cached = PriceDB(db.db_path).rate_matrix()
+
+    assert cached is not matrix
+    assert cached.rates.keys() == matrix.rates.keys()
+    assert cached.rate("₽", datetime.date(2022, 12, 3)) == 62
+    assert len(list((tmp_path / "cache").iterdir())) == 1
+
+
+def test_parse_balance():
+    output = "\n".join([
+        "$-1,500.00\tAssets:Bank",
+        "           $430.00",
+        "            7 AAPL\tAssets:Broker",
+        "0\tAssets:Empty",
+        '2.5 "VANGUARD 500"\tAssets:Fund',
+    ])
+
+    dollar_style = AmountStyle(separated=False)
+    assert list(parse_balance(output)) == [
+        AccountAmount("Assets:Bank", "$", Decimal("-1500.00"), dollar_style),
+        AccountAmount("Assets:Broker", "$", Decimal("430.00"), dollar_style),
+        AccountAmount("Assets:Broker", "AAPL", Decimal(7), AmountStyle(prefix=False, precision=0)),
+        AccountAmount("Assets:Fund", "VANGUARD 500", Decimal("2.5"), AmountStyle(prefix=False, precision=1)),
+    ]
+
+
+def test_balance_several_currencies(tmp_path: Path, monkeypatch, fake_ledger, app_config):
+    monkeypatch.setattr(config_module, "CACHE_DIR", tmp_path / "cache")
+    PriceDB(app_config.price_db_settings.path).append_rows(RATES)
+    monkeypatch.setenv("FAKE_LEDGER_OUTPUT", "\n".join([
+        "10.00 GEL\tAssets:Bank",
+        "$100.00",
+        "620.00 ₽\tAssets:Cash",
+    ]))
+
+    output = balance(
+        config=app_config,
+        patterns=["^Assets"],
+        end=datetime.datetime(2023, 1, 1),
+        exchange=["USD", "RUB"],
+    )
+
+    assert output.splitlines() == [
+        "Rates of 2022-12-31",
+        "Account            $           ₽",
+        "Assets:Bank      n/a         n/a",
+        "Assets:Cash  $110.00  6,820.00 ₽",
+        "Total        $110.00  6,820.00 ₽",
+        "No rates for: 10.00 GEL",
+    ]
+    # Native balances come from the accounts tree balance call, patterns are applied in Python
+    [call] = [c for c in fake_ledger.calls if "balance" in c]
+    assert "--flat" in call and "^Assets" not in call and "--exchange" not in call
+
+    # GEL has no rates, but GEL amounts are still shown in the GEL column
+    output = balance(
+        config=app_config,
+        patterns=["^Assets"],
+        end=datetime.datetime(2023, 1, 1),
+        exchange=["USD", "GEL"],
+    )
+
+    assert output.splitlines() == [
+        "Rates of 2022-12-31",
+        "Account            $        GEL",
+        "Assets:Bank      n/a  10.00 GEL",
+        "Assets:Cash  $110.00        n/a",
+        "Total        $110.00  10.00 GEL",
+        "No $ rates for: 10.00 GEL",
+        "No GEL rates for: $100.00, 620.00 ₽",
+    ]
+
+
+def test_balance_tree_several_currencies_depth(tmp_path: Path, monkeypatch, fake_ledger, app_config):
+    monkeypatch.setattr(config_module, "CACHE_DIR", tmp_path / "cache")
+    PriceDB(app_config.price_db_settings.path).append_rows(RATES)
+    monkeypatch.setenv("FAKE_LEDGER_OUTPUT", "\n".join([
+        "620.00 ₽\tAssets:Bank:Deposit",
+        "$100.00\tAssets:Cash",
+        "$10.00\tExpenses:Food",
+    ]))
+
+    output = balance_tree(
+        config=app_config,
+        patterns=["^Assets"],
+        depth=1,
+        end=datetime.datetime(2023, 1, 1),
+        exchange=["USD", "RUB"],
+    )
+
+    assert output.splitlines() == [
+        "Rates of 2022-12-31",
+        "Account        $           ₽",
+        "Assets   $110.00  6,820.00 ₽",
+        "Total    $110.00  6,820.00 ₽",
+    ]
+    assert not any("--depth" in c for c in fake_ledger.calls)
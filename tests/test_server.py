@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from ledger_manager.api.services import LedgerClient
+from ledger_manager.server import STREAM_LIMIT, UseCaseServer, request
+
+
+@pytest.fixture
+def server(tmp_path: Path, fake_ledger, app_config):
+    socket_path = tmp_path / "server.sock"
+    server = UseCaseServer(app_config, socket_path, jobs=2)
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(server.serve_forever())
+
+    def run():
+        try:
+            loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            pass
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+
+    while not socket_path.exists():
+        time.sleep(0.01)
+
+    yield socket_path
+
+    loop.call_soon_threadsafe(task.cancel)
+    thread.join()
+    loop.close()
+    assert not socket_path.exists()
+
+
+def test_server(server: Path, fake_ledger):
+    balance = {"use_case": "balance", "patterns": ["^Expenses"], "begin": "2022-01-01", "end": "2022-02-01"}
+
+    response = request(server, {"id": 1, **balance})
+    assert response["id"] == 1
+    assert response["error"] is None
+    assert "balance --begin 2022-01-01 --end 2022-02-01" in response["output"]
+
+    assert request(server, {"id": 2, **balance})["output"] == response["output"]
+    assert sum("accounts" in c for c in fake_ledger.calls) == 1
+    assert sum("balance" in c for c in fake_ledger.calls) == 1
+
+
+def test_server_errors(server: Path):
+    response = request(server, {"id": 3, "use_case": "unknown"})
+    assert response["id"] == 3
+    assert "ValidationError" in response["error"]
+
+
+def test_server_metrics(server: Path):
+    request(server, {"use_case": "balance"})
+    response = request(server, {"use_case": "metrics"})
+
+    assert response["error"] is None
+    assert 'ledger_manager_server_requests_total{use_case="balance",status="ok"}' in response["output"]
+    assert "# TYPE ledger_manager_ledger_call_duration_seconds histogram" in response["output"]
+
+
+def test_server_long_request(server: Path):
+    assert server.stat().st_mode & 0o777 == 0o600
+
+    response = request(server, {"id": 5, "use_case": "balance", "patterns": ["x" * STREAM_LIMIT]})
+    assert response["id"] is None
+    assert response["error"] == f"Request is longer than {STREAM_LIMIT} bytes"
+
+
+def test_server_unexpected_error(server: Path, monkeypatch):
+
+    def update_price_db(self):
+        raise FileNotFoundError("ledger")
+
+    monkeypatch.setattr(UseCaseServer, "update_price_db", update_price_db)
+
+    response = request(server, {"id": 4, "use_case": "update_price_db"})
+    assert response["id"] == 4
+    assert response["error"] == "FileNotFoundError: ledger"
+
+
+def test_client_cache_eviction(fake_ledger, app_config):
+    client = LedgerClient.from_config(app_config, cache_results=True)
+    client.call(["ledger", "balance"])
+    client.call(["ledger", "register"])
+
+    app_config.transactions_path.write_text("; changed\n")
+    client.call(["ledger", "balance"])
+
+    assert list(client._results) == [("ledger", "balance")]
+    assert list(client._locks) == [("ledger", "balance")]
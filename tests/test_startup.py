@@ -0,0 +1,34 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+# Import-time budget for the CLI module, seconds. Override for slow machines.
+STARTUP_BUDGET = float(os.environ.get("LEDGER_MANAGER_STARTUP_BUDGET", "0.5"))
+
+HEAVY_MODULES = ["requests", "pydantic", "arrow", "yaml", "ledger_manager.api.use_cases"]
+
+IMPORT_BENCHMARK = """
+import json, sys, time
+start = time.perf_counter()
+import ledger_manager.cli
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+@pytest.fixture(scope="module")
+def cli_import():
+    output = subprocess.check_output([sys.executable, "-c", IMPORT_BENCHMARK], text=True)
+    return json.loads(output)
+
+
+@pytest.mark.parametrize("module", HEAVY_MODULES)
+def test_cli_import_is_lazy(cli_import, module):
+    assert module not in cli_import["modules"]
+
+
+def test_cli_import_time(cli_import):
+    assert cli_import["elapsed"] < STARTUP_BUDGET
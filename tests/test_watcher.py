@@ -0,0 +1,102 @@
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from ledger_manager.api.services.journal import InputFiles, journal_files
+from ledger_manager.api.services.watcher import InputWatcher
+from ledger_manager.cli.common import CommonParams, run_use_case
+from ledger_manager.console import console
+
+
+def test_journal_files(tmp_path: Path):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "main.dat").write_text("include sub/2022.dat\n!include sub/*.inc\n2022/01/01 Payee\n")
+    (tmp_path / "sub" / "2022.dat").write_text("include ../shared.dat\n")
+    (tmp_path / "sub" / "a.inc").write_text("")
+    (tmp_path / "shared.dat").write_text("include main.dat\n")
+
+    assert journal_files(tmp_path / "main.dat") == [
+        tmp_path / "main.dat",
+        tmp_path / "sub" / "2022.dat",
+        tmp_path / "shared.dat",
+        tmp_path / "sub" / "a.inc",
+    ]
+
+
+def test_inputs_fingerprint(tmp_path: Path):
+    journal = tmp_path / "main.dat"
+    journal.write_text("2022/01/01 Payee\n")
+    inputs = InputFiles(journal, tmp_path / "price.db")
+
+    fingerprint = inputs.fingerprint()
+    assert inputs.paths() == [journal, tmp_path / "price.db"]
+
+    journal.write_text("2022/01/01 Payee\n")
+    assert inputs.fingerprint() == fingerprint
+
+    (tmp_path / "price.db").write_text("P 2022/01/01 00:00:00 USD 61.2 RUB\n")
+    assert inputs.fingerprint() != fingerprint
+
+    fingerprint = inputs.fingerprint()
+    journal.write_text("include other.dat\n")
+    (tmp_path / "other.dat").write_text("2022/01/02 Payee\n")
+    assert inputs.paths() == [journal, tmp_path / "other.dat", tmp_path / "price.db"]
+    assert inputs.fingerprint() != fingerprint
+
+
+@pytest.mark.parametrize("use_inotify", [True, False])
+def test_watcher_change_during_run(tmp_path: Path, use_inotify):
+    journal = tmp_path / "main.dat"
+    journal.write_text("2022/01/01 Payee\n")
+    watcher = InputWatcher(InputFiles(journal, tmp_path / "price.db"), debounce=0.01, use_inotify=use_inotify)
+
+    # Saved before the wait, e.g. while the first report runs
+    journal.write_text("2022/01/02 Payee\n")
+
+    try:
+        assert watcher.wait() == watcher.inputs.fingerprint()
+    finally:
+        watcher.close()
+
+
+def test_run_use_case_watch(tmp_path: Path, monkeypatch, app_config):
+    runs = []
+
+    def use_case(*, config, client):
+        runs.append(client.inputs.fingerprint())
+        if len(runs) == 1:
+            app_config.transactions_path.write_text("2022/01/02 Payee\n")
+        else:
+            raise KeyboardInterrupt
+
+        return "output"
+
+    monkeypatch.setattr(CommonParams, "config", app_config)
+    ctx = SimpleNamespace(obj=CommonParams(config_file=tmp_path / "config.yaml"), command_path="ledger-manager test")
+
+    run_use_case(ctx, use_case, watch=True)
+
+    assert len(runs) == 2
+    assert runs[0] != runs[1]
+
+
+def test_run_use_case_watch_error(tmp_path: Path, monkeypatch, app_config):
+    runs = []
+
+    def use_case(*, config, client):
+        runs.append(client.inputs.fingerprint())
+        if len(runs) == 1:
+            app_config.transactions_path.write_text("2022/01/02 Payee\n")
+            raise ValueError("Half-saved journal")
+
+        raise KeyboardInterrupt
+
+    monkeypatch.setattr(CommonParams, "config", app_config)
+    ctx = SimpleNamespace(obj=CommonParams(config_file=tmp_path / "config.yaml"), command_path="ledger-manager test")
+
+    with console.capture() as capture:
+        run_use_case(ctx, use_case, watch=True)
+
+    assert len(runs) == 2
+    assert "Half-saved journal" in capture.get()